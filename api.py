@@ -0,0 +1,189 @@
+"""
+Headless bulk read API for historical readings.
+
+Serves the same data as the Device Reading page without going through the
+Streamlit UI. Run it next to the app with:
+
+    $ python api.py --port 8502
+
+Endpoints:
+    GET /sensors     Sensor configurations as JSON.
+    GET /metrics     Firestore call metrics of this process in Prometheus text format.
+    GET /readings    Paginated readings. Query parameters:
+                     sensor_id  Only return readings for this sensor.
+                     start/end  ISO dates or datetimes, [start, end) in Asia/Kuala_Lumpur if no offset is given.
+                     format     arrow (default), parquet or ndjson.
+                     page_size  Gateway documents per page (default 500, max 5000).
+                     cursor     Value of X-Next-Cursor from the previous page.
+                     Readings moved to the archive by compact.py are served first,
+                     then Firestore pages.
+"""
+import argparse
+import gzip
+import hmac
+import ipaddress
+import json
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from urllib.parse import urlparse, parse_qs
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import streamlit as st
+
+from pages.device_reading import fetch_readings_page, fetch_sensor_configurations
+from utils.instrumentation import prometheus_text
+
+COLLECTION_NAME = 'iot_gateway_data'
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+
+logger = logging.getLogger(__name__)
+
+# Every page is serialized against this schema, so empty pages match full ones
+READINGS_SCHEMA = pa.schema([
+    ('sensorID', pa.string()),
+    ('reading_type', pa.string()),
+    ('reading_value', pa.float64()),
+    ('timestamp', pa.timestamp('us', tz='Asia/Kuala_Lumpur')),
+])
+
+FORMATS = {
+    'arrow': 'application/vnd.apache.arrow.stream',
+    'parquet': 'application/vnd.apache.parquet',
+    'ndjson': 'application/x-ndjson',
+}
+
+def parse_time(value):
+    """Parse an ISO date or datetime query parameter into a timezone-aware timestamp."""
+    if not value:
+        return None
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.tz_localize('Asia/Kuala_Lumpur')
+    return timestamp
+
+def serialize_readings(df, fmt):
+    """
+    Serialize a readings DataFrame into the requested columnar format.
+
+    Args:
+        df (pd.DataFrame): Readings DataFrame.
+        fmt (str): One of 'arrow', 'parquet' or 'ndjson'.
+
+    Returns:
+        bytes: Serialized body.
+    """
+    if fmt == 'ndjson':
+        if df.empty:
+            return b''
+        return df.to_json(orient='records', lines=True, date_format='iso').encode('utf-8')
+
+    table = pa.Table.from_pandas(df.reindex(columns=READINGS_SCHEMA.names), schema=READINGS_SCHEMA, preserve_index=False)
+    output = BytesIO()
+    if fmt == 'parquet':
+        pq.write_table(table, output, compression='zstd')
+    else:
+        options = pa.ipc.IpcWriteOptions(compression='zstd')
+        with pa.ipc.new_stream(output, table.schema, options=options) as writer:
+            writer.write_table(table)
+    return output.getvalue()
+
+def get_api_token():
+    """Return the optional bearer token configured under [api] in Streamlit secrets."""
+    try:
+        return st.secrets.get("api", {}).get("token")
+    except FileNotFoundError:
+        return None
+
+class ReadingsAPIHandler(BaseHTTPRequestHandler):
+    """Request handler for the bulk read API."""
+
+    def do_GET(self):
+        token = get_api_token()
+        if token and not hmac.compare_digest(self.headers.get('Authorization', ''), f'Bearer {token}'):
+            self.send_json(401, {'error': 'Unauthorized'})
+            return
+
+        url = urlparse(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            if url.path == '/sensors':
+                self.send_json(200, fetch_sensor_configurations())
+            elif url.path == '/readings':
+                self.send_readings(params)
+            elif url.path == '/metrics':
+                self.send_body(200, prometheus_text().encode('utf-8'), 'text/plain; version=0.0.4')
+            else:
+                self.send_json(404, {'error': 'Not found'})
+        except ValueError as e:
+            self.send_json(400, {'error': str(e)})
+        except Exception:
+            # Firestore and other unexpected errors still get a response instead of a dropped connection
+            logger.exception("Error handling %s", self.path)
+            self.send_json(500, {'error': 'Internal server error'})
+
+    def send_readings(self, params):
+        fmt = params.get('format', 'arrow')
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported format '{fmt}', expected one of {', '.join(FORMATS)}.")
+        page_size = int(params.get('page_size', DEFAULT_PAGE_SIZE))
+        if not 0 < page_size <= MAX_PAGE_SIZE:
+            raise ValueError(f"page_size must be between 1 and {MAX_PAGE_SIZE}.")
+
+        df, next_cursor = fetch_readings_page(
+            COLLECTION_NAME,
+            sensor_id=params.get('sensor_id'),
+            start=parse_time(params.get('start')),
+            end=parse_time(params.get('end')),
+            page_size=page_size,
+            cursor=params.get('cursor'),
+        )
+        headers = {'X-Next-Cursor': next_cursor} if next_cursor else {}
+        self.send_body(200, serialize_readings(df, fmt), FORMATS[fmt], headers)
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload, default=str).encode('utf-8')
+        self.send_body(status, body, 'application/json')
+
+    def send_body(self, status, body, content_type, headers=None):
+        # Arrow and Parquet bodies are already zstd-compressed internally
+        if content_type in ('application/json', FORMATS['ndjson']) and 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body)
+            headers = {**(headers or {}), 'Content-Encoding': 'gzip'}
+
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+def is_loopback(host):
+    """Return True if binding to host only accepts connections from this machine."""
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless bulk read API for historical readings.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8502)
+    args = parser.parse_args()
+
+    # Readings must not be exposed beyond this machine without authentication
+    if not is_loopback(args.host) and not get_api_token():
+        parser.error(f"refusing to bind to {args.host} without a token under [api] in secrets")
+
+    server = ThreadingHTTPServer((args.host, args.port), ReadingsAPIHandler)
+    print(f"Serving readings API on http://{args.host}:{args.port}")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
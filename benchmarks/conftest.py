@@ -0,0 +1,71 @@
+import os
+import sys
+from datetime import datetime, timezone
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from firestore_utils import set_database
+from utils.fake_firestore import FakeFirestoreClient
+from utils.history_cache import clear_history_cache
+from utils.synthetic_data import populate
+
+BENCHMARK_ROUNDS = 5
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('data layer benchmarks')
+    group.addoption('--bench-sensors', type=int, default=20, help="Number of synthetic sensors.")
+    group.addoption('--bench-days', type=int, default=7, help="Days of synthetic gateway history.")
+    group.addoption('--bench-interval', type=int, default=60, help="Seconds between synthetic gateway uploads.")
+    group.addoption('--bench-users', type=int, default=50, help="Number of synthetic user accounts.")
+
+
+@pytest.fixture(scope='session')
+def dataset_options(request):
+    return {
+        'n_sensors': request.config.getoption('--bench-sensors'),
+        'n_days': request.config.getoption('--bench-days'),
+        'interval_seconds': request.config.getoption('--bench-interval'),
+        'n_users': request.config.getoption('--bench-users'),
+        'end': datetime.now(timezone.utc).replace(second=0, microsecond=0),
+    }
+
+
+@pytest.fixture(scope='session')
+def fake_db(dataset_options):
+    """Synthetic in-memory Firestore, injected through firestore_utils.get_database()."""
+    client = populate(FakeFirestoreClient(), **dataset_options)
+    set_database(client)
+    yield client
+    set_database(None)
+
+
+@pytest.fixture
+def measure(benchmark, fake_db):
+    """
+    Benchmark a data-layer call and attach its Firestore reads and peak memory.
+
+    The call is first run once under tracemalloc to record reads and memory,
+    then timed by pytest-benchmark. The session history cache is cleared
+    before every run, so each one measures a cold fetch rather than cache hits.
+    Returns the result and the read count.
+    """
+    import tracemalloc
+
+    def run(func, *args, **kwargs):
+        clear_history_cache()
+        fake_db.reset_counters()
+        tracemalloc.start()
+        result = func(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        reads = fake_db.read_count
+
+        benchmark.extra_info['firestore_reads'] = reads
+        benchmark.extra_info['peak_memory_kib'] = peak // 1024
+        benchmark.pedantic(func, args, kwargs, setup=clear_history_cache, rounds=BENCHMARK_ROUNDS)
+        return result, reads
+
+    return run
@@ -0,0 +1,226 @@
+"""
+Concurrent-session load harness for the Streamlit app.
+
+Simulates N logged-in operators on one replica. Each session is a Streamlit
+AppTest running streamlit_app.py against the in-memory Firestore stand-in,
+cycling through Home, Device Reading and Device Center with a think time
+between reruns (30s matches the Home auto-refresh). Reports p50/p99 rerun
+latency per page, CPU, memory per session and Firestore reads per minute.
+
+AppTest is not thread-safe, so sessions are driven by one scheduler that
+always reruns the session whose next rerun is due first. Reruns are
+serialized: once demand exceeds capacity, reruns start late and the
+response time (due to done) grows while the rerun time itself stays flat.
+
+This is not how a real replica behaves. Its sessions run on separate
+threads and overlap while waiting on Firestore, and the in-memory stand-in
+answers instantly. With the default --firestore-latency-ms 0 the results
+measure CPU-bound capacity only. With a latency set, every wait is also
+serialized, so response times are a pessimistic upper bound.
+
+Run with:
+
+    $ python benchmarks/load_sessions.py --sessions 20 --duration 300 --think-time 30
+
+Pass --max-p99 to exit non-zero when the p99 response time (seconds) is exceeded.
+"""
+import argparse
+import gc
+import heapq
+import json
+import logging
+import os
+import resource
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from streamlit.testing.v1 import AppTest
+
+from firestore_utils import set_database
+from utils.fake_firestore import FakeFirestoreClient
+from utils.synthetic_data import SYNTHETIC_PASSWORD, populate
+
+APP_PATH = os.path.join(ROOT, 'streamlit_app.py')
+SCENARIO = ['Home', 'Device Reading', 'Device Center']
+
+
+def rss_kib():
+    """Current resident set size of this process in KiB (Linux), else the peak RSS."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def login(app, username):
+    """Log a fresh AppTest session in through the login form."""
+    app.run()
+    app.text_input[0].input(username)
+    app.text_input[1].input(SYNTHETIC_PASSWORD)
+    app.button[0].click()
+    app.run()
+    if not app.session_state['logged_in']:
+        raise RuntimeError(f"Login failed for {username}")
+
+
+def new_session(username, timeout):
+    """Create a logged-in AppTest session."""
+    app = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    login(app, username)
+    return app
+
+
+def warm_up(timeout):
+    """Run one logged-in session through every scenario page, then discard it."""
+    app = new_session('user1', timeout)
+    for page in SCENARIO:
+        app.session_state['navbar'] = page
+        app.run()
+
+
+def percentiles(values):
+    return {
+        'count': len(values),
+        'p50': float(np.percentile(values, 50)) if values else None,
+        'p99': float(np.percentile(values, 99)) if values else None,
+    }
+
+
+def run_load_test(sessions, duration, think_time, n_sensors, n_days, interval_seconds, timeout=60,
+                  firestore_latency=0.0):
+    """
+    Run the load test and return a report dict.
+
+    Args:
+        sessions (int): Number of concurrent logged-in sessions.
+        duration (float): Seconds to keep the sessions running after login.
+        think_time (float): Seconds each session waits between reruns.
+        n_sensors (int): Synthetic sensors in the fake Firestore.
+        n_days (int): Days of synthetic gateway history.
+        interval_seconds (int): Seconds between synthetic gateway uploads.
+        timeout (float): Per-rerun AppTest timeout in seconds.
+        firestore_latency (float): Seconds each Firestore round trip sleeps.
+
+    Returns:
+        dict: Latency percentiles per page and overall, CPU, memory and Firestore reads.
+    """
+    db = populate(FakeFirestoreClient(latency=firestore_latency), n_sensors=n_sensors, n_days=n_days,
+                  interval_seconds=interval_seconds, n_users=max(sessions, 2))
+    set_database(db)
+
+    # One throwaway session through every page first, so one-time import and
+    # module-level costs are not counted as memory per session
+    warm_up(timeout)
+    gc.collect()
+    started_rss = rss_kib()
+    # user1 is an admin, so every session can open Device Center
+    apps = [new_session('user1', timeout) for _ in range(sessions)]
+    db.reset_counters()
+
+    latencies = {}
+    response_times = []
+    errors = []
+    cpu_started = time.process_time()
+    wall_started = time.monotonic()
+    deadline = wall_started + duration
+
+    # Spread first reruns over one think time, like users arriving at random
+    schedule = [(wall_started + i * think_time / sessions, i, i) for i in range(sessions)]
+    heapq.heapify(schedule)
+    while schedule:
+        due, session_id, step = heapq.heappop(schedule)
+        if due >= deadline:
+            continue
+        wait = due - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+
+        app = apps[session_id]
+        page = SCENARIO[step % len(SCENARIO)]
+        app.session_state['navbar'] = page
+        started = time.perf_counter()
+        app.run()
+        finished = time.monotonic()
+
+        latencies.setdefault(page, []).append(time.perf_counter() - started)
+        response_times.append(finished - due)
+        if app.exception:
+            errors.append(f"{page}: {app.exception[0].message}")
+        heapq.heappush(schedule, (finished + think_time, session_id, step + 1))
+
+    wall = time.monotonic() - wall_started
+    cpu = time.process_time() - cpu_started
+    set_database(None)
+
+    all_latencies = [latency for values in latencies.values() for latency in values]
+    return {
+        'sessions': sessions,
+        'firestore_latency_ms': round(firestore_latency * 1000, 1),
+        'duration_s': round(wall, 1),
+        'pages': {page: percentiles(values) for page, values in latencies.items()},
+        'overall': percentiles(all_latencies),
+        'response': percentiles(response_times),
+        'cpu_seconds': round(cpu, 2),
+        'cpu_utilization': round(cpu / wall, 2),
+        'memory_per_session_kib': (rss_kib() - started_rss) // sessions,
+        'firestore_reads': db.read_count,
+        'firestore_reads_per_minute': round(db.read_count / (wall / 60), 1),
+        'errors': errors,
+    }
+
+
+def print_report(report):
+    print(f"Sessions: {report['sessions']}   Duration: {report['duration_s']}s   "
+          f"Firestore latency: {report['firestore_latency_ms']}ms")
+    print(f"{'Page':<16}{'Reruns':>8}{'p50 (s)':>10}{'p99 (s)':>10}")
+    for page, stats in {**report['pages'], 'All': report['overall']}.items():
+        print(f"{page:<16}{stats['count']:>8}{stats['p50'] or 0:>10.3f}{stats['p99'] or 0:>10.3f}")
+    response = report['response']
+    print(f"Response time (due to done): p50 {response['p50'] or 0:.3f}s, p99 {response['p99'] or 0:.3f}s")
+    print(f"CPU: {report['cpu_seconds']}s ({report['cpu_utilization']} cores)")
+    print(f"Memory per session: {report['memory_per_session_kib']} KiB")
+    print(f"Firestore reads: {report['firestore_reads']} ({report['firestore_reads_per_minute']}/min)")
+    print("Note: reruns are serialized, so Firestore waits never overlap as they do across sessions on a real replica.")
+    if report['errors']:
+        print(f"Errors ({len(report['errors'])}): {report['errors'][0]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for the Streamlit app.")
+    parser.add_argument('--sessions', type=int, default=10, help="Concurrent logged-in sessions.")
+    parser.add_argument('--duration', type=float, default=60, help="Seconds to run after login.")
+    parser.add_argument('--think-time', type=float, default=30, help="Seconds between reruns per session.")
+    parser.add_argument('--sensors', type=int, default=20, help="Synthetic sensors.")
+    parser.add_argument('--days', type=int, default=7, help="Days of synthetic history.")
+    parser.add_argument('--interval', type=int, default=60, help="Seconds between synthetic gateway uploads.")
+    parser.add_argument('--firestore-latency-ms', type=float, default=0,
+                        help="Simulated latency of each Firestore round trip.")
+    parser.add_argument('--json', help="Also write the report to this JSON file.")
+    parser.add_argument('--max-p99', type=float, help="Fail if the p99 response time exceeds this (seconds).")
+    args = parser.parse_args()
+
+    # AppTest sessions run outside `streamlit run` and would flood the log with bare-mode warnings
+    logging.getLogger('streamlit').setLevel(logging.ERROR)
+
+    report = run_load_test(args.sessions, args.duration, args.think_time, args.sensors, args.days, args.interval,
+                           firestore_latency=args.firestore_latency_ms / 1000)
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as output:
+            json.dump(report, output, indent=2)
+
+    if report['errors']:
+        sys.exit(1)
+    if args.max_p99 is not None and (report['response']['p99'] or 0) > args.max_p99:
+        print(f"p99 response time above {args.max_p99}s")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Tiered retention checks: readings must be returned exactly once whether they
+are in Firestore, in the Parquet archive, or in both after an interrupted
+compaction run.
+"""
+from datetime import datetime, timedelta, timezone
+from glob import glob
+
+import pandas as pd
+import pytest
+
+import firestore_utils
+from firestore_utils import set_database
+from pages.device_reading import fetch_historical_readings, fetch_readings_page
+from utils.archive import compact_collection, flatten_documents, merge_closed_partitions, write_archive
+from utils.fake_firestore import FakeFirestoreClient
+from utils.history_cache import clear_history_cache
+from utils.synthetic_data import populate
+
+COLLECTION_NAME = 'iot_gateway_data'
+
+
+@pytest.fixture
+def tiered_db(tmp_path, monkeypatch):
+    """Two days of synthetic history with the archive in a temporary directory."""
+    monkeypatch.setattr('utils.archive.get_archive_dir', lambda: str(tmp_path))
+    # Restores the session-wide fake_db, if any, after the test
+    monkeypatch.setattr(firestore_utils, '_database_override', None)
+    client = populate(FakeFirestoreClient(), n_sensors=3, n_days=2, interval_seconds=600, n_users=2)
+    set_database(client)
+    clear_history_cache()
+    yield client
+    clear_history_cache()
+
+
+def readings(df):
+    return sorted(zip(df['sensorID'], df['reading_type'], df['timestamp'].astype('int64')))
+
+
+def fetch_all_tiers(start_date, end_date):
+    clear_history_cache()
+    return {
+        'full_scan': readings(fetch_historical_readings(COLLECTION_NAME)),
+        'range': readings(fetch_historical_readings(COLLECTION_NAME, None, start_date, end_date)),
+    }
+
+
+def test_interrupted_compaction_is_not_read_twice(tiered_db, tmp_path):
+    today = datetime.now(timezone.utc).astimezone().date()
+    expected = fetch_all_tiers(today - timedelta(days=2), today)
+
+    # Archive day-old documents but stop before deleting them
+    cutoff = datetime.now(timezone.utc) - timedelta(days=1)
+    old_docs = tiered_db.collection(COLLECTION_NAME).where('timestamp', '<', cutoff).get()
+    assert write_archive(flatten_documents(old_docs), str(tmp_path), COLLECTION_NAME)
+
+    assert fetch_all_tiers(today - timedelta(days=2), today) == expected
+
+
+def test_compacted_readings_are_still_read(tiered_db, tmp_path):
+    today = datetime.now(timezone.utc).astimezone().date()
+    expected = fetch_all_tiers(today - timedelta(days=2), today)
+
+    stats = compact_collection(tiered_db, COLLECTION_NAME, older_than_days=1, archive_dir=str(tmp_path))
+    assert stats['documents'] > 0
+
+    assert fetch_all_tiers(today - timedelta(days=2), today) == expected
+
+
+def fetch_all_pages():
+    frames, cursor = [], None
+    while True:
+        df, cursor = fetch_readings_page(COLLECTION_NAME, page_size=50, cursor=cursor)
+        frames.append(df)
+        if not cursor:
+            return readings(pd.concat(frames, ignore_index=True))
+
+
+def test_pages_cover_both_tiers_once(tiered_db, tmp_path):
+    expected = fetch_all_pages()
+
+    # Compact the oldest day, then archive the next half day without deleting it
+    compact_collection(tiered_db, COLLECTION_NAME, older_than_days=1, archive_dir=str(tmp_path))
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=12)
+    hot_docs = tiered_db.collection(COLLECTION_NAME).where('timestamp', '<', cutoff).get()
+    write_archive(flatten_documents(hot_docs), str(tmp_path), COLLECTION_NAME)
+
+    assert fetch_all_pages() == expected
+
+
+def test_closed_partitions_merge_into_one_file(tiered_db, tmp_path):
+    today = datetime.now(timezone.utc).astimezone().date()
+    expected = fetch_all_tiers(today - timedelta(days=2), today)
+
+    # Small pages write one part file per page, month and sensor
+    compact_collection(tiered_db, COLLECTION_NAME, older_than_days=1, archive_dir=str(tmp_path), page_size=20)
+    partitions = glob(str(tmp_path / COLLECTION_NAME / 'month=*' / 'sensor=*'))
+    assert any(len(glob(f"{partition}/*.parquet")) > 1 for partition in partitions)
+
+    # A cutoff past the end of every archived month closes them all
+    assert merge_closed_partitions(COLLECTION_NAME, datetime.now(timezone.utc) + timedelta(days=62), str(tmp_path)) > 0
+    assert all(len(glob(f"{partition}/*.parquet")) == 1 for partition in partitions)
+    assert fetch_all_tiers(today - timedelta(days=2), today) == expected
@@ -0,0 +1,88 @@
+"""
+Offline micro-benchmarks for the data layer.
+
+Run with:
+
+    $ pytest benchmarks/ --bench-sensors 50 --bench-days 30
+
+Each benchmark reports time (pytest-benchmark), and peak memory and Firestore
+document reads in extra_info. Read counts are also asserted, so a change that
+turns a targeted read into a collection scan fails the suite.
+"""
+from datetime import timedelta
+
+from firestore_utils import get_device_configs, get_users
+from pages.device_reading import export_to_excel, export_to_pdf, fetch_historical_readings, fetch_sensor_configurations
+from pages.home import fetch_latest_readings
+from utils.report import build_sensor_report
+
+COLLECTION_NAME = 'iot_gateway_data'
+EXPORT_ROWS = 2000
+
+
+def gateway_uploads(dataset_options):
+    return int(dataset_options['n_days'] * 86400 // dataset_options['interval_seconds'])
+
+
+def test_fetch_historical_readings_full_scan(measure, dataset_options):
+    df, reads = measure(fetch_historical_readings, COLLECTION_NAME)
+    # Every upload plus the current_reading document
+    assert reads == gateway_uploads(dataset_options) + 1
+    assert not df.empty
+
+
+def test_fetch_historical_readings_one_day(measure, dataset_options):
+    end = dataset_options['end']
+    day = (end - timedelta(days=1)).astimezone().date()
+    df, reads = measure(fetch_historical_readings, COLLECTION_NAME, None, day, day)
+    assert not df.empty
+    assert reads <= 86400 // dataset_options['interval_seconds'] + 1
+
+
+def test_fetch_historical_readings_one_sensor(measure, dataset_options):
+    end = dataset_options['end']
+    start_day = (end - timedelta(days=dataset_options['n_days'] - 1)).astimezone().date()
+    df, reads = measure(fetch_historical_readings, COLLECTION_NAME, '01', start_day, end.astimezone().date())
+    assert set(df['sensorID']) == {'01'}
+    # A ranged fetch reads at most the uploads in the range, never the whole collection
+    assert 0 < reads <= gateway_uploads(dataset_options)
+
+
+def test_fetch_latest_readings(measure, dataset_options):
+    df, reads = measure(fetch_latest_readings, COLLECTION_NAME)
+    assert reads == 1
+    assert df['sensorID'].nunique() == dataset_options['n_sensors']
+
+
+def test_get_device_configs(measure, dataset_options):
+    configs, reads = measure(get_device_configs)
+    assert reads == dataset_options['n_sensors']
+
+
+def test_get_users(measure, dataset_options):
+    users, reads = measure(get_users, {'role': 'admin', 'username': 'user1'})
+    assert reads == dataset_options['n_users']
+    assert all(user['role'] != 'super_admin' for user in users)
+
+
+def test_export_to_excel(measure, fake_db):
+    df = fetch_historical_readings(COLLECTION_NAME).dropna(subset=['timestamp']).head(EXPORT_ROWS)
+    output, reads = measure(lambda: export_to_excel(df.copy()))
+    assert reads == 0
+    assert output.getbuffer().nbytes > 0
+
+
+def test_export_to_pdf(measure, fake_db):
+    df = fetch_historical_readings(COLLECTION_NAME).head(EXPORT_ROWS)
+    output, reads = measure(export_to_pdf, df)
+    assert reads == 0
+    assert output.getvalue().startswith(b'%PDF')
+
+
+def test_build_sensor_report(measure, fake_db):
+    # Unfiltered, including the current_reading rows without a timestamp
+    df = fetch_historical_readings(COLLECTION_NAME)
+    configs = fetch_sensor_configurations()
+    output, reads = measure(build_sensor_report, df, configs)
+    assert reads == 0
+    assert output.getvalue().startswith(b'%PDF')
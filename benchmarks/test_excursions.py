@@ -0,0 +1,48 @@
+"""
+Behavior checks for the vectorized excursion statistics on hand-built series.
+"""
+import pandas as pd
+
+from utils.excursions import compute_excursion_stats
+
+CONFIGS = {'01': {'Temp_min_threshold': 10, 'Temp_max_threshold': 20}}
+
+
+def readings(values, sensor_id='01', reading_type='Temp'):
+    start = pd.Timestamp('2024-09-01 08:00', tz='Asia/Kuala_Lumpur')
+    return pd.DataFrame({
+        'sensorID': sensor_id,
+        'reading_type': reading_type,
+        'reading_value': values,
+        'timestamp': [start + pd.Timedelta(minutes=i) for i in range(len(values))],
+    })
+
+
+def test_runs_are_counted_and_timed():
+    # Two runs out of spec: 25, 26 held for 2 minutes and 5 held for 1 minute, over 5 minutes in total
+    stats = compute_excursion_stats(readings([15, 25, 26, 15, 5, 15]), CONFIGS)
+    row = stats.iloc[0]
+    assert row['excursions'] == 2
+    assert row['total_excursion'] == pd.Timedelta(minutes=3)
+    assert row['max_excursion'] == pd.Timedelta(minutes=2)
+    assert row['time_in_spec_pct'] == 40.0
+    assert (row['min'], row['max']) == (5, 26)
+
+
+def test_series_are_separated():
+    # A run at the end of one series must not continue into the next
+    df = pd.concat([readings([15, 25]), readings([25, 15], sensor_id='02')], ignore_index=True)
+    configs = {**CONFIGS, '02': CONFIGS['01']}
+    stats = compute_excursion_stats(df, configs).set_index('sensorID')
+    assert stats.loc['01', 'excursions'] == 1
+    assert stats.loc['01', 'total_excursion'] == pd.Timedelta(0)
+    assert stats.loc['02', 'excursions'] == 1
+    assert stats.loc['02', 'total_excursion'] == pd.Timedelta(minutes=1)
+
+
+def test_readings_without_timestamp_are_ignored():
+    df = readings([15, 25, 26, 15, 5, 15])
+    current = pd.DataFrame({'sensorID': ['01'], 'reading_type': ['Temp'], 'reading_value': [30], 'timestamp': [pd.NaT]})
+    stats = compute_excursion_stats(pd.concat([df, current], ignore_index=True), CONFIGS)
+    expected = compute_excursion_stats(df, CONFIGS)
+    pd.testing.assert_frame_equal(stats, expected)
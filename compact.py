@@ -0,0 +1,35 @@
+"""
+Compaction job for tiered retention of gateway readings.
+
+Moves 'iot_gateway_data' documents older than the retention period into
+zstd-compressed Parquet files partitioned by month and sensor, then deletes
+them from Firestore. Months entirely older than the retention period are
+merged into one file per sensor. fetch_historical_readings reads both tiers,
+so the Device Reading page is unaffected. Run it daily, e.g. from cron:
+
+    $ python compact.py --older-than-days 90
+
+The archive directory and retention default to `dir` and `retention_days`
+under [archive] in Streamlit secrets.
+"""
+import argparse
+import json
+
+from firestore_utils import get_database
+from utils.archive import compact_collection, get_archive_dir, get_retention_days
+
+COLLECTION_NAME = 'iot_gateway_data'
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive old gateway readings out of Firestore.")
+    parser.add_argument('--older-than-days', type=int, default=None,
+                        help=f"Hot-tier retention in days (default {get_retention_days()}).")
+    parser.add_argument('--archive-dir', default=None, help=f"Archive directory (default {get_archive_dir()}).")
+    parser.add_argument('--dry-run', action='store_true', help="Only count the documents that would be moved.")
+    args = parser.parse_args()
+
+    stats = compact_collection(get_database(), COLLECTION_NAME, args.older_than_days, args.archive_dir, dry_run=args.dry_run)
+    print(json.dumps(stats))
+
+if __name__ == "__main__":
+    main()
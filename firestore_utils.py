@@ -3,6 +3,8 @@ import json
 import bcrypt
 from google.oauth2 import service_account
 from google.cloud import firestore
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from utils.instrumentation import instrument
 
 def initialize_firestore():
     """
@@ -17,17 +19,39 @@ def initialize_firestore():
     db = firestore.Client(credentials=creds, project=key_dict["project_id"])
     return db
 
+_headless_db = None
+_database_override = None
+
+def set_database(client):
+    """
+    Use the given client for every later get_database() call.
+    This is how the in-memory stand-in (utils.fake_firestore) is injected for
+    offline benchmarks and load tests. Pass None to go back to Firestore.
+    """
+    global _database_override
+    _database_override = instrument(client)
+
 def get_database():
     """
     Get Firestore database client.
     This function ensures that the Firestore client is initialized once and reused.
+    The client is wrapped so every call is recorded by utils.instrumentation.
+    Outside `streamlit run` (e.g. the bulk read API) session state is not kept
+    between calls, so a single process-wide client is used instead.
     """
+    global _headless_db
+    if _database_override is not None:
+        return _database_override
+
+    if get_script_run_ctx(suppress_warning=True) is None:
+        if _headless_db is None:
+            _headless_db = instrument(initialize_firestore())
+        return _headless_db
+
     if "db" not in st.session_state:
-        st.session_state.db = initialize_firestore()
+        st.session_state.db = instrument(initialize_firestore())
     return st.session_state.db
 
-db = get_database()
-
 def get_user_role(username):
     db = get_database()
     user_ref = db.collection('users').document(username)
@@ -52,6 +76,7 @@ def hash_password(password):
 
 def get_users(current_user):
     """Retrieve users from Firestore based on current user's role."""
+    db = get_database()
     users_ref = db.collection('users')
     docs = users_ref.stream()
     users = []
@@ -72,6 +97,7 @@ def get_users(current_user):
 
 def update_user(username, name=None, email=None, password=None, role=None):
     """Update an existing user in Firestore."""
+    db = get_database()
     user_ref = db.collection('users').document(username)
     updates = {}
     if name:
@@ -86,11 +112,13 @@ def update_user(username, name=None, email=None, password=None, role=None):
 
 def remove_user(username):
     """Remove a user from Firestore."""
+    db = get_database()
     user_ref = db.collection('users').document(username)
     user_ref.delete()
 
 def add_user(new_username, new_name, new_email, new_password, new_role):
     """Add a new user to Firestore."""
+    db = get_database()
     user_ref = db.collection('users').document(new_username)
     user_ref.set({
         'name': new_name,
@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
 from firestore_utils import get_database
+from utils.instrumentation import render_phase
 
 def fetch_all_devices():
     """Fetch all Device IDs and names from the 'sensor_configurations' collection."""
@@ -88,14 +89,16 @@ def device_center():
             st.error("Please provide a Device ID to delete.")
 
     # Fetch all devices
-    devices = fetch_all_devices()
+    with render_phase('fetch_devices'):
+        devices = fetch_all_devices()
 
     if devices:
         st.subheader("Device Threshold Configuration")
 
         # Fetch existing configurations
         device_ids = [device['id'] for device in devices]
-        existing_configs = fetch_device_configurations(device_ids)
+        with render_phase('fetch_configs'):
+            existing_configs = fetch_device_configurations(device_ids)
 
         # Prepare data for display
         data = []
@@ -7,6 +7,11 @@ from reportlab.platypus import SimpleDocTemplate, Table, TableStyle
 from io import BytesIO
 from datetime import datetime
 from firestore_utils import get_database
+from utils.history_cache import get_cached_readings
+from utils.excursions import compute_excursion_stats
+from utils.archive import archived_months, read_archived_readings
+from utils.report import build_sensor_report
+from utils.instrumentation import render_phase
 
 # Fetch device configurations and thresholds
 def fetch_sensor_configurations():
@@ -20,11 +25,8 @@ def fetch_sensor_configurations():
         configs[sensor_id] = config
     return configs
 
-# Fetch historical readings from Firestore
-def fetch_historical_readings(collection_name, sensor_id=None, start_date=None, end_date=None):
-    db = get_database()
-    docs = db.collection(collection_name).get()
-    
+def _readings_to_dataframe(docs, sensor_id=None):
+    """Flatten gateway documents into one row per sensor reading, keeping the document ID."""
     data = []
     for doc in docs:
         record = doc.to_dict()
@@ -39,23 +41,150 @@ def fetch_historical_readings(collection_name, sensor_id=None, start_date=None,
                     continue
                 
                 data.append({
+                    'doc_id': doc.id,
                     'sensorID': sensor_id_from_key,
                     'reading_type': reading_type,
                     'reading_value': value,
                     'timestamp': timestamp
                 })
 
-    df = pd.DataFrame(data)
-    if not df.empty:
-        df['timestamp'] = pd.to_datetime(df['timestamp'], utc=True).dt.tz_convert('Asia/Kuala_Lumpur')
-        
-        if start_date and end_date:
-            start_datetime = pd.to_datetime(start_date).tz_localize('Asia/Kuala_Lumpur')
-            end_datetime = pd.to_datetime(end_date).tz_localize('Asia/Kuala_Lumpur') + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
-            df = df[(df['timestamp'] >= start_datetime) & (df['timestamp'] <= end_datetime)]
-            
+    # Fixed columns, so an empty result still has the same shape as a full one
+    df = pd.DataFrame(data, columns=['doc_id', 'sensorID', 'reading_type', 'reading_value', 'timestamp'])
+    df['timestamp'] = pd.to_datetime(df['timestamp'], utc=True).dt.tz_convert('Asia/Kuala_Lumpur')
     return df
 
+def _combine_tiers(archived_df, hot_df):
+    """
+    Concatenate archived and hot readings, oldest first, without their doc_id column.
+
+    A compaction run interrupted between archiving and deleting leaves documents
+    in both tiers, so archived rows whose document is still hot are dropped.
+    """
+    if not archived_df.empty and not hot_df.empty:
+        archived_df = archived_df[~archived_df['doc_id'].isin(hot_df['doc_id'])]
+    frames = [frame for frame in (archived_df, hot_df) if not frame.empty]
+    if not frames:
+        df = hot_df
+    elif len(frames) == 1:
+        df = frames[0]
+    else:
+        df = pd.concat(frames, ignore_index=True).sort_values(by='timestamp', kind='stable', ignore_index=True)
+    return df.drop(columns='doc_id', errors='ignore')
+
+# Fetch readings with timestamps in [start, end) from Firestore and the local archive
+def fetch_readings_in_range(collection_name, sensor_id, start, end):
+    db = get_database()
+    query = db.collection(collection_name) \
+        .where('timestamp', '>=', start.to_pydatetime()) \
+        .where('timestamp', '<', end.to_pydatetime())
+    hot_df = _readings_to_dataframe(query.get(), sensor_id)
+    return _combine_tiers(read_archived_readings(collection_name, sensor_id, start, end, with_doc_id=True), hot_df)
+
+ARCHIVE_CURSOR_PREFIX = 'archive:'
+ARCHIVE_DONE_CURSOR = 'archive:done'
+
+def _parse_archive_cursor(cursor):
+    """Split an 'archive:<timestamp in us>:<doc_id>' cursor into (timestamp, doc_id)."""
+    try:
+        _, timestamp, doc_id = cursor.split(':', 2)
+        return pd.Timestamp(int(timestamp), unit='us', tz='UTC'), doc_id
+    except ValueError:
+        raise ValueError(f"Unknown cursor '{cursor}', restart paging without a cursor.")
+
+def _fetch_archive_page(db, collection_name, sensor_id, start, end, page_size, cursor):
+    """
+    Return the next page_size archived documents' readings and the cursor after
+    them, or None once there is nothing archived left to serve.
+
+    Archived documents are paged in (timestamp, doc_id) order, reading only the
+    month partitions needed to fill the page. They are cut off at the oldest
+    document still in Firestore, so documents left in both tiers by an
+    interrupted compaction are served once.
+    """
+    oldest = list(db.collection(collection_name).order_by('timestamp').limit(1).stream())
+    archive_end = end
+    if oldest:
+        boundary = pd.Timestamp(oldest[0].get('timestamp'))
+        archive_end = boundary if end is None else min(end, boundary)
+
+    after_time, after_id = _parse_archive_cursor(cursor) if cursor else (None, None)
+    frames = []
+    documents = 0
+    for month in archived_months(collection_name, sensor_id, start, archive_end):
+        month_start = pd.Timestamp(f"{month}-01", tz='UTC')
+        month_end = month_start + pd.offsets.MonthBegin(1)
+        if after_time is not None and month_end <= after_time:
+            continue
+        lower = max(bound for bound in (month_start, start, after_time) if bound is not None)
+        upper = month_end if archive_end is None else min(archive_end, month_end)
+        df = read_archived_readings(collection_name, sensor_id, lower, upper, with_doc_id=True)
+        if after_time is not None:
+            df = df[(df['timestamp'] > after_time) | ((df['timestamp'] == after_time) & (df['doc_id'] > after_id))]
+        frames.append(df)
+        documents += df['doc_id'].nunique()
+        # One document more than the page proves there is a next page
+        if documents > page_size:
+            break
+
+    if not documents:
+        return None
+
+    df = pd.concat(frames, ignore_index=True).sort_values(by=['timestamp', 'doc_id'], kind='stable', ignore_index=True)
+    page_docs = df['doc_id'].drop_duplicates()
+    if len(page_docs) > page_size:
+        page_docs = page_docs.iloc[:page_size]
+        df = df[df['doc_id'].isin(page_docs)]
+        last = df.iloc[-1]
+        next_cursor = f"{ARCHIVE_CURSOR_PREFIX}{last['timestamp'].tz_convert('UTC').value // 1000}:{last['doc_id']}"
+    else:
+        next_cursor = ARCHIVE_DONE_CURSOR
+    return df.drop(columns='doc_id').reset_index(drop=True), next_cursor
+
+# Fetch one page of readings ordered by timestamp. Archived readings come first,
+# followed by Firestore pages resuming after the cursor document.
+def fetch_readings_page(collection_name, sensor_id=None, start=None, end=None, page_size=500, cursor=None):
+    db = get_database()
+    if cursor == ARCHIVE_DONE_CURSOR:
+        cursor = None
+    elif not cursor or cursor.startswith(ARCHIVE_CURSOR_PREFIX):
+        page = _fetch_archive_page(db, collection_name, sensor_id, start, end, page_size, cursor)
+        if page is not None:
+            return page
+        cursor = None
+
+    query = db.collection(collection_name)
+    if start is not None:
+        query = query.where('timestamp', '>=', start.to_pydatetime())
+    if end is not None:
+        query = query.where('timestamp', '<', end.to_pydatetime())
+    query = query.order_by('timestamp')
+    if cursor:
+        snapshot = db.collection(collection_name).document(cursor).get()
+        if not snapshot.exists:
+            raise ValueError(f"Unknown cursor '{cursor}', restart paging without a cursor.")
+        query = query.start_after(snapshot)
+
+    docs = list(query.limit(page_size).stream())
+    next_cursor = docs[-1].id if len(docs) == page_size else None
+    return _readings_to_dataframe(docs, sensor_id).drop(columns='doc_id', errors='ignore'), next_cursor
+
+# Fetch historical readings from Firestore
+def fetch_historical_readings(collection_name, sensor_id=None, start_date=None, end_date=None):
+    if not (start_date and end_date):
+        db = get_database()
+        hot_df = _readings_to_dataframe(db.collection(collection_name).get(), sensor_id)
+        return _combine_tiers(read_archived_readings(collection_name, sensor_id, with_doc_id=True), hot_df)
+
+    # Only the parts of the range not loaded earlier in this session are read from Firestore
+    start_datetime = pd.to_datetime(start_date).tz_localize('Asia/Kuala_Lumpur')
+    end_datetime = pd.to_datetime(end_date).tz_localize('Asia/Kuala_Lumpur') + pd.Timedelta(days=1)
+    return get_cached_readings(
+        (collection_name, sensor_id),
+        start_datetime,
+        end_datetime,
+        lambda gap_start, gap_end: fetch_readings_in_range(collection_name, sensor_id, gap_start, gap_end)
+    )
+
 # Plot time series data with thresholds
 def plot_time_series_with_thresholds(df, thresholds, sensor_id_filter):
     df['timestamp'] = pd.to_datetime(df['timestamp'])
@@ -159,7 +288,8 @@ def device_reading():
     st.title("Historical Data Readings")
     
     # Fetch device configurations and thresholds
-    sensor_configs = fetch_sensor_configurations()
+    with render_phase('fetch_configs'):
+        sensor_configs = fetch_sensor_configurations()
 
     # Create filter section
     st.header("Filter Options")
@@ -181,7 +311,8 @@ def device_reading():
 
     # Fetch historical readings
     collection_name = 'iot_gateway_data'
-    df = fetch_historical_readings(collection_name, sensor_id if sensor_id != 'All' else None, start_date, end_date)
+    with render_phase('fetch_history'):
+        df = fetch_historical_readings(collection_name, sensor_id if sensor_id != 'All' else None, start_date, end_date)
 
     if df.empty:
         st.write("No data available.")
@@ -189,18 +320,44 @@ def device_reading():
 
     # Plot time series with thresholds
     st.header("Device Readings Over Time")
-    plot_time_series_with_thresholds(df, sensor_configs, sensor_id)
+    with render_phase('plot'):
+        plot_time_series_with_thresholds(df, sensor_configs, sensor_id)
+
+    # Threshold excursion analytics
+    st.header("Threshold Excursions")
+    with render_phase('excursions'):
+        excursion_df = compute_excursion_stats(df, sensor_configs)
+    excursion_df = excursion_df.rename(columns={
+        'sensorID': 'Device ID',
+        'reading_type': 'Reading Type',
+        'excursions': 'Excursions',
+        'total_excursion': 'Total Out of Range',
+        'max_excursion': 'Longest Excursion',
+        'time_in_spec_pct': 'Time in Spec (%)',
+        'min': 'Min',
+        'max': 'Max',
+        'mean': 'Mean',
+        'p95': 'P95',
+    })
+    st.dataframe(excursion_df, use_container_width=True, hide_index=True)
 
         # Export functionality
     st.header("Export Data")
     
     if st.button('Export to Excel'):
-        excel_file = export_to_excel(df)
+        with render_phase('export_excel'):
+            excel_file = export_to_excel(df)
         st.download_button('Download Excel File', excel_file.getvalue(), file_name='sensor_readings.xlsx', mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
     
     if st.button('Export to PDF'):
-        pdf_file = export_to_pdf(df)
+        with render_phase('export_pdf'):
+            pdf_file = export_to_pdf(df)
         st.download_button('Download PDF File', pdf_file.getvalue(), file_name='sensor_readings.pdf', mime='application/pdf')
 
+    if st.button('Export PDF Report'):
+        with render_phase('export_report'), st.spinner("Rendering charts..."):
+            report_file = build_sensor_report(df, sensor_configs, title=f"Sensor Readings Report {start_date:%d/%m/%Y} - {end_date:%d/%m/%Y}")
+        st.download_button('Download PDF Report', report_file.getvalue(), file_name='sensor_report.pdf', mime='application/pdf')
+
 if __name__ == "__main__":
     device_reading()
@@ -3,6 +3,7 @@ import pandas as pd
 from datetime import datetime, timezone
 from firestore_utils import get_database, get_device_configs
 from streamlit_autorefresh import st_autorefresh
+from utils.instrumentation import render_phase
 
 def fetch_latest_readings(collection_name):
     """Fetch the latest reading for each sensor from Firestore."""
@@ -35,10 +36,117 @@ def fetch_latest_readings(collection_name):
         return pd.DataFrame()
 
 
-def display_sensor_readings(latest_df, device_configs):
-    """Render the sensor readings inside a container."""
+READING_TYPES = ['Temp', 'Pressure', 'FlowRate']
+STALE_MINUTES = 10
+PAGE_SIZES = [20, 50, 100]
+GRID_COLUMNS = 5
+
+# Severity levels used for filtering and sorting the sensor grid
+SEVERITY_OK = 0
+SEVERITY_ALARM = 1
+SEVERITY_STALE = 2
+
+
+def compute_sensor_statuses(latest_df, device_configs):
+    """
+    Compute the card state of every configured sensor without rendering anything.
+
+    Returns:
+        list: One dict per sensor with its name, last update, readings, alert flags and severity.
+    """
     current_time = datetime.now(timezone.utc).astimezone()  # Ensure timezone-aware current time
-    
+
+    # Group the latest readings once instead of filtering the frame per sensor
+    latest_timestamps = latest_df.groupby('sensorID')['timestamp'].max().to_dict()
+    readings = latest_df.drop_duplicates(['sensorID', 'reading_type']) \
+        .set_index(['sensorID', 'reading_type'])['reading_value'].to_dict()
+
+    statuses = []
+    for sensor_id, config in device_configs.items():
+        latest_timestamp = latest_timestamps.get(sensor_id)
+        card_class = ''
+        stale = True
+
+        if latest_timestamp is None or pd.isna(latest_timestamp):
+            last_update = 'No data'
+        else:
+            if latest_timestamp.tzinfo is None:
+                latest_timestamp = latest_timestamp.tz_localize('UTC')  # Localize to UTC if naive
+
+            last_update = latest_timestamp.strftime('%d/%m/%Y %H:%M')
+
+            # Flash red if the last update is more than STALE_MINUTES old
+            minutes_diff = (current_time - latest_timestamp).total_seconds() / 60
+            stale = minutes_diff > STALE_MINUTES
+            if stale:
+                card_class = 'flash-red'
+
+        sensor_readings = {}
+        alerts = {}
+        for reading_type in READING_TYPES:
+            if (sensor_id, reading_type) not in readings:
+                continue
+            reading_value = readings[(sensor_id, reading_type)]
+            threshold_max = config.get(f'{reading_type}_max_threshold')
+            threshold_min = config.get(f'{reading_type}_min_threshold')
+            is_alert_max = threshold_max and reading_value > threshold_max
+            is_alert_min = threshold_min and reading_value < threshold_min
+            sensor_readings[reading_type] = reading_value
+            alerts[reading_type] = bool(is_alert_max or is_alert_min)
+
+        if stale:
+            severity = SEVERITY_STALE
+        elif any(alerts.values()):
+            severity = SEVERITY_ALARM
+        else:
+            severity = SEVERITY_OK
+
+        statuses.append({
+            'sensor_id': sensor_id,
+            'name': config.get('name', f'Sensor {sensor_id}'),
+            'last_update': last_update,
+            'card_class': card_class,
+            'readings': sensor_readings,
+            'alerts': alerts,
+            'severity': severity,
+        })
+
+    return statuses
+
+
+def render_sensor_card(status):
+    """Render a single sensor card."""
+    st.markdown(f"""
+        <div style="border: 1px solid #E0E0E0; box-shadow: 0 4px 6px #B0B0B0; border-radius: 10px; padding: 10px; margin-bottom: 10px;" class="{status['card_class']}">
+            <div style="text-align: center; margin-bottom: 15px; border-bottom: 1px solid #E0E0E0; padding-bottom: 10px; font-size: 1.25em; color: #333; font-weight: bold;">
+                {status['name']}
+                <p style="font-size: 0.85em; color: #888;"><strong>Last Update:</strong> {status['last_update']}</p>
+            </div>
+            <div style="display: flex; flex-wrap: wrap; gap: 10px;">
+    """, unsafe_allow_html=True)
+
+    for reading_type in READING_TYPES:
+        if reading_type in status['readings']:
+            alert_class = 'flash-yellow' if status['alerts'][reading_type] else ''
+            st.markdown(f"""
+                <div style="background-color: #F5F5F5; border-radius: 8px; padding: 12px; text-align: center;" class="{alert_class}">
+                    <p style="margin: 0; font-weight: bold;">{reading_type}:</p>
+                    <p style="margin: 0;">{status['readings'][reading_type]}</p>
+                </div>
+            """, unsafe_allow_html=True)
+        else:
+            st.markdown(f"""
+                <div style="background-color: #F5F5F5; border-radius: 8px; padding: 12px; text-align: center;">
+                    <p style="margin: 0; font-weight: bold;">{reading_type}:</p>
+                    <p style="margin: 0; color: #888;">No data available</p>
+                </div>
+            """, unsafe_allow_html=True)
+
+    st.markdown("</div></div>", unsafe_allow_html=True)
+
+
+def display_sensor_readings(latest_df, device_configs):
+    """Render the visible page of sensor cards, filtered and sorted by the grid controls."""
     # Define CSS for flashing animations
     st.write("""
         <style>
@@ -58,84 +166,51 @@ def display_sensor_readings(latest_df, device_configs):
         </style>
     """, unsafe_allow_html=True)
 
-    cols = st.columns(5)  # Adjust the number of columns if needed
-    
-    for i, (sensor_id, config) in enumerate(device_configs.items()):
-        name = config.get('name', f'Sensor {sensor_id}')
-        temp_max_threshold = config.get('Temp_max_threshold')
-        temp_min_threshold = config.get('Temp_min_threshold')
-        pressure_max_threshold = config.get('Pressure_max_threshold')
-        pressure_min_threshold = config.get('Pressure_min_threshold')
-        
-        device_df = latest_df[latest_df['sensorID'] == sensor_id]
-
-        if device_df.empty:
-            card_class = ''
-            last_update = 'No data'
-        else:
-            latest_timestamp = device_df["timestamp"].max()
-
-            # Ensure that latest_timestamp is timezone-aware
-            if pd.isna(latest_timestamp):
-                last_update = 'No data'
-            else:
-                if latest_timestamp.tzinfo is None:
-                    latest_timestamp = latest_timestamp.tz_localize('UTC')  # Localize to UTC if naive
-
-                last_update = latest_timestamp.strftime('%d/%m/%Y %H:%M')
-
-                # Calculate time difference in minutes
-                time_diff = current_time - latest_timestamp
-                minutes_diff = time_diff.total_seconds() / 60
-
-                # Apply the flash-red class if time difference is more than 10 minutes
-                if minutes_diff > 10:
-                    card_class = 'flash-red'
-                else:
-                    card_class = ''
+    # Grid controls, keyed so they survive the auto-refresh
+    col1, col2, col3, col4 = st.columns([3, 2, 2, 1])
+    with col1:
+        search = st.text_input("Search by name or ID", key="sensor_grid_search")
+    with col2:
+        sort_by = st.selectbox("Sort by", ['Severity', 'Name', 'Device ID'], key="sensor_grid_sort")
+    with col3:
+        page_size = st.selectbox("Cards per page", PAGE_SIZES, key="sensor_grid_page_size")
+    with col4:
+        problems_only = st.toggle("Alarming/stale only", key="sensor_grid_problems_only")
+
+    statuses = compute_sensor_statuses(latest_df, device_configs)
+
+    if search:
+        term = search.strip().lower()
+        statuses = [status for status in statuses
+                    if term in status['sensor_id'].lower() or term in status['name'].lower()]
+    if problems_only:
+        statuses = [status for status in statuses if status['severity'] != SEVERITY_OK]
+
+    if sort_by == 'Severity':
+        statuses.sort(key=lambda status: (-status['severity'], status['name'].lower()))
+    elif sort_by == 'Name':
+        statuses.sort(key=lambda status: status['name'].lower())
+    else:
+        statuses.sort(key=lambda status: status['sensor_id'])
 
-        col = cols[i % 5]
+    if not statuses:
+        st.write("No sensors match the current filters.")
+        return
 
-        with col:
-            st.markdown(f"""
-                <div style="border: 1px solid #E0E0E0; box-shadow: 0 4px 6px #B0B0B0; border-radius: 10px; padding: 10px; margin-bottom: 10px;" class="{card_class}">
-                    <div style="text-align: center; margin-bottom: 15px; border-bottom: 1px solid #E0E0E0; padding-bottom: 10px; font-size: 1.25em; color: #333; font-weight: bold;">
-                        {name}
-                        <p style="font-size: 0.85em; color: #888;"><strong>Last Update:</strong> {last_update}</p>
-                    </div>
-                    <div style="display: flex; flex-wrap: wrap; gap: 10px;">
-            """, unsafe_allow_html=True)
+    page_count = (len(statuses) - 1) // page_size + 1
+    # Filters can shrink the page count below the page the user was on
+    if st.session_state.get('sensor_grid_page', 1) > page_count:
+        st.session_state['sensor_grid_page'] = page_count
+    page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, step=1, key="sensor_grid_page")
+    first = (page - 1) * page_size
+    visible = statuses[first:first + page_size]
+    st.caption(f"Showing {first + 1}-{first + len(visible)} of {len(statuses)} sensors")
 
-            for reading_type in ['Temp', 'Pressure', 'FlowRate']:
-                reading_row = device_df[device_df['reading_type'] == reading_type]
-                if not reading_row.empty:
-                    reading_value = reading_row['reading_value'].values[0]
-                    if reading_type == 'Temp':
-                        threshold_max = temp_max_threshold
-                        threshold_min = temp_min_threshold
-                    elif reading_type == 'Pressure':
-                        threshold_max = pressure_max_threshold
-                        threshold_min = pressure_min_threshold
-
-                    is_alert_max = threshold_max and reading_value > threshold_max
-                    is_alert_min = threshold_min and reading_value < threshold_min
-                    alert_class = 'flash-yellow' if is_alert_max or is_alert_min else ''
-
-                    st.markdown(f"""
-                        <div style="background-color: #F5F5F5; border-radius: 8px; padding: 12px; text-align: center;" class="{alert_class}">
-                            <p style="margin: 0; font-weight: bold;">{reading_type}:</p>
-                            <p style="margin: 0;">{reading_value}</p>
-                        </div>
-                    """, unsafe_allow_html=True)
-                else:
-                    st.markdown(f"""
-                        <div style="background-color: #F5F5F5; border-radius: 8px; padding: 12px; text-align: center;">
-                            <p style="margin: 0; font-weight: bold;">{reading_type}:</p>
-                            <p style="margin: 0; color: #888;">No data available</p>
-                        </div>
-                    """, unsafe_allow_html=True)
-
-            st.markdown("</div></div>", unsafe_allow_html=True)
+    # Only the visible page of cards is rendered
+    cols = st.columns(GRID_COLUMNS)
+    for i, status in enumerate(visible):
+        with cols[i % GRID_COLUMNS]:
+            render_sensor_card(status)
 
 
 def home():
@@ -143,19 +218,22 @@ def home():
     st.title("IoT Dashboard Overview")
 
     # Fetch the device configurations and thresholds
-    device_configs = get_device_configs()
+    with render_phase('fetch_configs'):
+        device_configs = get_device_configs()
     collection_name = "iot_gateway_data"
 
     # Auto-refresh with 30 seconds interval
     st_autorefresh(interval=30000, key="data_refresh")
 
     # Fetch latest readings
-    latest_df = fetch_latest_readings(collection_name)
+    with render_phase('fetch_latest'):
+        latest_df = fetch_latest_readings(collection_name)
     if latest_df.empty:
         st.write("No data available.")
     else:
         latest_df['formatted_timestamp'] = latest_df['timestamp'].dt.strftime('%d/%m/%Y %H:%M:%S')
 
         # Display sensor readings
-        display_sensor_readings(latest_df, device_configs)
+        with render_phase('render_grid'):
+            display_sensor_readings(latest_df, device_configs)
 
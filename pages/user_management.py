@@ -1,11 +1,10 @@
 import streamlit as st
 from firestore_utils import get_database, update_user, remove_user, add_user
-
-# Initialize Firestore client
-db = get_database()
+from utils.instrumentation import render_phase
 
 def get_users(current_user):
     """Retrieve users from Firestore based on the current user's role."""
+    db = get_database()
     users_ref = db.collection('users')
     docs = users_ref.stream()
     users = []
@@ -53,7 +52,8 @@ def user_management():
 
         # Fetch and display users
         current_user = {'role': current_role}  # This should be your logged-in user's data
-        users = get_users(current_user)
+        with render_phase('fetch_users'):
+            users = get_users(current_user)
 
         # Filter out super_admin users
         filtered_users = [user for user in users if user['role'] != 'super_admin']
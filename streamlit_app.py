@@ -2,6 +2,7 @@ import streamlit as st
 from auth import login_user, logout_user
 from firestore_utils import get_user_role
 from streamlit_navigation_bar import st_navbar
+from utils.instrumentation import begin_rerun, end_rerun, render_phase, render_profiling_panel
 
 # Importing page functions from pages folder
 from pages.home import home
@@ -43,8 +44,18 @@ if st.session_state['logged_in']:
     # Set the selected option as the current page
     st.session_state['current_page'] = selected
 
-    # Handle navigation based on selected page
-    handle_navigation()
+    # Handle navigation based on selected page, recording Firestore calls and render phases.
+    # end_rerun also runs when a page stops the script early, e.g. st.rerun() on logout.
+    begin_rerun(selected)
+    try:
+        with render_phase(selected):
+            handle_navigation()
+
+        # Profiling panel for admins only
+        if st.session_state['user_role'] in ['super_admin', 'admin']:
+            render_profiling_panel()
+    finally:
+        end_rerun()
 
 else:
     #st.title("Login")
@@ -56,16 +67,20 @@ else:
         </div>
     """, unsafe_allow_html=True)
     
-    # Login form
-    username = st.text_input("Username")
-    password = st.text_input("Password", type="password")
-    if st.button("Login"):
-        user = login_user(username, password)
-        if user:
-            st.session_state['logged_in'] = True
-            st.session_state['user_role'] = get_user_role(username)
-            st.session_state['current_user'] = user  # Ensure the user data is set
-            st.session_state['current_page'] = 'Home'
-            st.rerun()
-        else:
-            st.error("Invalid login credentials.")
+    # Login form, with its Firestore reads recorded under its own page
+    begin_rerun('Login')
+    try:
+        username = st.text_input("Username")
+        password = st.text_input("Password", type="password")
+        if st.button("Login"):
+            user = login_user(username, password)
+            if user:
+                st.session_state['logged_in'] = True
+                st.session_state['user_role'] = get_user_role(username)
+                st.session_state['current_user'] = user  # Ensure the user data is set
+                st.session_state['current_page'] = 'Home'
+                st.rerun()
+            else:
+                st.error("Invalid login credentials.")
+    finally:
+        end_rerun()
@@ -0,0 +1,297 @@
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from glob import glob
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import streamlit as st
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_ARCHIVE_DIR = os.path.join(ROOT, 'archive')
+DEFAULT_RETENTION_DAYS = 90
+PAGE_SIZE = 5000  # Documents per archive write, fewer and larger Parquet files
+DELETE_BATCH_SIZE = 500  # Firestore allows at most 500 writes per batch
+ROW_GROUP_SIZE = 64 * 1024  # Small enough for timestamp filters to skip most of a merged file
+
+ARCHIVE_SCHEMA = pa.schema([
+    ('doc_id', pa.string()),
+    ('sensorID', pa.string()),
+    ('reading_type', pa.string()),
+    ('reading_value', pa.float64()),
+    ('timestamp', pa.timestamp('us', tz='UTC')),
+])
+
+
+def get_archive_dir():
+    """Return the archive directory, configurable as `dir` under [archive] in secrets."""
+    try:
+        return st.secrets.get("archive", {}).get("dir", DEFAULT_ARCHIVE_DIR)
+    except FileNotFoundError:
+        return DEFAULT_ARCHIVE_DIR
+
+
+def get_retention_days():
+    """Return the hot-tier retention in days, configurable as `retention_days` under [archive] in secrets."""
+    try:
+        return int(st.secrets.get("archive", {}).get("retention_days", DEFAULT_RETENTION_DAYS))
+    except FileNotFoundError:
+        return DEFAULT_RETENTION_DAYS
+
+
+def _month_range(start, end):
+    """List 'YYYY-MM' UTC months overlapping [start, end)."""
+    month = pd.Timestamp(start).tz_convert('UTC').tz_localize(None).to_period('M')
+    last = (pd.Timestamp(end).tz_convert('UTC').tz_localize(None) - pd.Timedelta(microseconds=1)).to_period('M')
+    months = []
+    while month <= last:
+        months.append(str(month))
+        month += 1
+    return months
+
+
+def _partition_files(archive_dir, collection_name, sensor_id=None, start=None, end=None):
+    """Find the archive files that can hold readings for the sensor and range, pruning by partition."""
+    base = os.path.join(archive_dir, collection_name)
+    sensor_pattern = f"sensor={sensor_id}" if sensor_id else "sensor=*"
+    if start is not None and end is not None:
+        months = _month_range(start, end)
+    else:
+        months = ['*']
+
+    files = []
+    for month in months:
+        files.extend(glob(os.path.join(base, f"month={month}", sensor_pattern, "*.parquet")))
+    return sorted(files)
+
+
+def archived_months(collection_name, sensor_id=None, start=None, end=None, archive_dir=None):
+    """List the 'YYYY-MM' UTC months with archived readings for the sensor and [start, end) range."""
+    if start is not None and end is not None and start >= end:
+        return []
+    base = os.path.join(archive_dir or get_archive_dir(), collection_name)
+    files = _partition_files(archive_dir or get_archive_dir(), collection_name, sensor_id)
+    months = sorted({os.path.relpath(path, base).split(os.sep)[0][len('month='):] for path in files})
+    if start is not None:
+        first = pd.Timestamp(start).tz_convert('UTC').strftime('%Y-%m')
+        months = [month for month in months if month >= first]
+    if end is not None:
+        last = (pd.Timestamp(end).tz_convert('UTC') - pd.Timedelta(microseconds=1)).strftime('%Y-%m')
+        months = [month for month in months if month <= last]
+    return months
+
+
+def flatten_documents(docs):
+    """Flatten gateway documents into archive rows, keeping the document ID for de-duplication."""
+    rows = []
+    for doc in docs:
+        record = doc.to_dict()
+        timestamp = record.get('timestamp')
+        if timestamp is None:
+            continue
+        for key, value in record.items():
+            if key.startswith(('Temp_', 'Pressure_', 'FlowRate_')):
+                rows.append({
+                    'doc_id': doc.id,
+                    'sensorID': key.split('_')[1],
+                    'reading_type': key.split('_')[0],
+                    'reading_value': value,
+                    'timestamp': timestamp,
+                })
+    df = pd.DataFrame(rows, columns=ARCHIVE_SCHEMA.names)
+    df['reading_value'] = pd.to_numeric(df['reading_value'], errors='coerce')
+    df['timestamp'] = pd.to_datetime(df['timestamp'], utc=True)
+    return df
+
+
+def _fsync_directory(directory):
+    """Persist renames and deletions in a directory (not supported on Windows)."""
+    if os.name == 'nt':
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _write_parquet(table, path):
+    """Write a Parquet file atomically: temporary name, fsync, rename, fsync the directory."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as output:
+        pq.write_table(table, output, compression='zstd', row_group_size=ROW_GROUP_SIZE)
+        output.flush()
+        os.fsync(output.fileno())
+    os.replace(tmp_path, path)
+    _fsync_directory(os.path.dirname(path))
+
+
+def write_archive(df, archive_dir, collection_name):
+    """
+    Write archive rows as zstd-compressed Parquet, one new file per month and sensor.
+
+    Files are fsynced before returning, so the source documents can be deleted safely.
+
+    Returns:
+        list: Paths of the files written.
+    """
+    if df.empty:
+        return []
+
+    paths = []
+    months = df['timestamp'].dt.strftime('%Y-%m')
+    part = uuid.uuid4().hex
+    for (month, sensor_id), group in df.groupby([months, 'sensorID'], sort=True):
+        directory = os.path.join(archive_dir, collection_name, f"month={month}", f"sensor={sensor_id}")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"part-{part}.parquet")
+        table = pa.Table.from_pandas(group.sort_values(by='timestamp'), schema=ARCHIVE_SCHEMA, preserve_index=False)
+        _write_parquet(table, path)
+        paths.append(path)
+    return paths
+
+
+def merge_partition(directory):
+    """
+    Merge the part files of one month and sensor partition into a single file.
+
+    The merged file is durable before the parts are deleted. A crash in between
+    only leaves duplicate rows, which read_archived_readings drops.
+
+    Returns:
+        int: Number of part files merged, 0 if there was nothing to merge.
+    """
+    parts = sorted(glob(os.path.join(directory, "*.parquet")))
+    if len(parts) < 2:
+        return 0
+
+    df = ds.dataset(parts, schema=ARCHIVE_SCHEMA, format='parquet').to_table().to_pandas()
+    df = df.drop_duplicates(subset=['doc_id', 'sensorID', 'reading_type']).sort_values(by=['timestamp', 'doc_id'])
+    table = pa.Table.from_pandas(df, schema=ARCHIVE_SCHEMA, preserve_index=False)
+    _write_parquet(table, os.path.join(directory, f"part-{uuid.uuid4().hex}.parquet"))
+
+    for part in parts:
+        os.remove(part)
+    _fsync_directory(directory)
+    return len(parts)
+
+
+def merge_closed_partitions(collection_name, cutoff, archive_dir=None):
+    """
+    Merge every partition of a month that ends before the cutoff.
+
+    Compaction only archives documents older than the cutoff, so such months
+    no longer grow, and each of their partitions can become one file.
+
+    Returns:
+        int: Number of part files merged.
+    """
+    base = os.path.join(archive_dir or get_archive_dir(), collection_name)
+    cutoff = pd.Timestamp(cutoff).tz_convert('UTC')
+    merged = 0
+    for month_dir in sorted(glob(os.path.join(base, "month=*"))):
+        month_start = pd.Timestamp(f"{os.path.basename(month_dir)[len('month='):]}-01", tz='UTC')
+        if month_start + pd.offsets.MonthBegin(1) > cutoff:
+            continue
+        for sensor_dir in sorted(glob(os.path.join(month_dir, "sensor=*"))):
+            merged += merge_partition(sensor_dir)
+    return merged
+
+
+def read_archived_readings(collection_name, sensor_id=None, start=None, end=None, archive_dir=None, with_doc_id=False):
+    """
+    Read archived readings for a sensor and [start, end) range.
+
+    Only the month and sensor partitions overlapping the request are opened,
+    and the timestamp filter is pushed down to the Parquet row groups.
+
+    Args:
+        with_doc_id (bool): Keep the source document ID, to de-duplicate
+            against documents still in the hot tier.
+
+    Returns:
+        pd.DataFrame: Readings in the same shape as fetch_historical_readings.
+    """
+    columns = ['sensorID', 'reading_type', 'reading_value', 'timestamp']
+    if with_doc_id:
+        columns = ['doc_id'] + columns
+    expression = None
+    if start is not None:
+        expression = ds.field('timestamp') >= pa.scalar(pd.Timestamp(start).tz_convert('UTC'), type=ARCHIVE_SCHEMA.field('timestamp').type)
+    if end is not None:
+        end_expression = ds.field('timestamp') < pa.scalar(pd.Timestamp(end).tz_convert('UTC'), type=ARCHIVE_SCHEMA.field('timestamp').type)
+        expression = end_expression if expression is None else expression & end_expression
+
+    for attempt in range(2):
+        files = _partition_files(archive_dir or get_archive_dir(), collection_name, sensor_id, start, end)
+        if not files:
+            return pd.DataFrame(columns=columns)
+        try:
+            df = ds.dataset(files, schema=ARCHIVE_SCHEMA, format='parquet').to_table(filter=expression).to_pandas()
+            break
+        except FileNotFoundError:
+            # A concurrent merge replaced the part files; list them again once
+            if attempt:
+                raise
+
+    # A run interrupted between archiving and deleting re-archives the same documents
+    df = df.drop_duplicates(subset=['doc_id', 'sensorID', 'reading_type'])
+    df['timestamp'] = df['timestamp'].dt.tz_convert('Asia/Kuala_Lumpur')
+    return df[columns].sort_values(by='timestamp', ignore_index=True)
+
+
+def compact_collection(db, collection_name, older_than_days=None, archive_dir=None, page_size=PAGE_SIZE, dry_run=False):
+    """
+    Move documents older than the retention period from the hot collection into the archive.
+
+    Documents are processed in timestamp order, one page at a time: each
+    page is written to the archive and fsynced before it is deleted.
+
+    Args:
+        db: Firestore client.
+        collection_name (str): Hot collection to compact.
+        older_than_days (int): Retention of the hot tier. Defaults to get_retention_days().
+        archive_dir (str): Archive directory. Defaults to get_archive_dir().
+        page_size (int): Documents read and archived per step.
+        dry_run (bool): Only count the documents that would be moved.
+
+    Returns:
+        dict: Documents and readings archived, files written, and part files merged.
+    """
+    older_than_days = older_than_days if older_than_days is not None else get_retention_days()
+    archive_dir = archive_dir or get_archive_dir()
+    cutoff = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+    stats = {'cutoff': cutoff.isoformat(), 'documents': 0, 'readings': 0, 'files': 0, 'merged': 0}
+
+    collection = db.collection(collection_name)
+    query = collection.where('timestamp', '<', cutoff).order_by('timestamp').limit(page_size)
+    last_doc = None
+    while True:
+        # In a dry run nothing is deleted, so page through with a cursor instead
+        page = query.start_after(last_doc) if dry_run and last_doc is not None else query
+        docs = list(page.stream())
+        if not docs:
+            break
+
+        df = flatten_documents(docs)
+        stats['documents'] += len(docs)
+        stats['readings'] += len(df)
+        if dry_run:
+            last_doc = docs[-1]
+        else:
+            stats['files'] += len(write_archive(df, archive_dir, collection_name))
+            for i in range(0, len(docs), DELETE_BATCH_SIZE):
+                batch = db.batch()
+                for doc in docs[i:i + DELETE_BATCH_SIZE]:
+                    batch.delete(collection.document(doc.id))
+                batch.commit()
+
+        if len(docs) < page_size:
+            break
+
+    # Each run adds a file per month and sensor; fold the months that are complete into one file each
+    if not dry_run:
+        stats['merged'] = merge_closed_partitions(collection_name, cutoff, archive_dir)
+    return stats
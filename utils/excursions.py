@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+
+READING_TYPES = ['Temp', 'Pressure', 'FlowRate']
+
+def thresholds_frame(sensor_configs):
+    """
+    Flatten sensor configurations into one threshold row per sensor and reading type.
+
+    Args:
+        sensor_configs (dict): Configurations keyed by sensor ID, as stored in 'sensor_configurations'.
+
+    Returns:
+        pd.DataFrame: Columns sensorID, reading_type, min_threshold, max_threshold.
+    """
+    rows = []
+    for sensor_id, config in sensor_configs.items():
+        for reading_type in READING_TYPES:
+            rows.append({
+                'sensorID': str(sensor_id),
+                'reading_type': reading_type,
+                'min_threshold': config.get(f'{reading_type}_min_threshold'),
+                'max_threshold': config.get(f'{reading_type}_max_threshold'),
+            })
+    df = pd.DataFrame(rows, columns=['sensorID', 'reading_type', 'min_threshold', 'max_threshold'])
+    df['min_threshold'] = pd.to_numeric(df['min_threshold'], errors='coerce')
+    df['max_threshold'] = pd.to_numeric(df['max_threshold'], errors='coerce')
+    return df
+
+def compute_excursion_stats(df, sensor_configs):
+    """
+    Compute threshold excursion statistics per sensor and reading type.
+
+    An excursion is a run of consecutive readings outside [min, max]. Each
+    reading is weighted by the time until the next reading of the same series,
+    so durations and time-in-spec reflect wall-clock time, not sample counts.
+
+    Args:
+        df (pd.DataFrame): Readings with sensorID, reading_type, reading_value and timestamp columns.
+        sensor_configs (dict): Configurations keyed by sensor ID.
+
+    Returns:
+        pd.DataFrame: One row per sensor and reading type with excursion count,
+        total and max excursion duration, time-in-spec percentage and
+        min/max/mean/p95 of the readings.
+    """
+    columns = ['sensorID', 'reading_type', 'excursions', 'total_excursion', 'max_excursion',
+               'time_in_spec_pct', 'min', 'max', 'mean', 'p95']
+    # Readings without a timestamp, e.g. from the current_reading document, cannot be placed in time
+    timestamps = pd.to_datetime(df['timestamp'], utc=True)
+    if timestamps.isna().any():
+        df, timestamps = df[timestamps.notna()], timestamps.dropna()
+    if df.empty:
+        return pd.DataFrame(columns=columns)
+
+    # Factorize each key column on its own and combine the integer codes,
+    # which is far cheaper than hashing (sensorID, reading_type) tuples
+    sensor_codes, sensor_keys = pd.factorize(df['sensorID'].astype(str))
+    type_codes, type_keys = pd.factorize(df['reading_type'].astype(str))
+    codes, pair_codes = pd.factorize(sensor_codes * len(type_keys) + type_codes)
+    series_keys = pd.MultiIndex.from_arrays([
+        sensor_keys[pair_codes // len(type_keys)],
+        type_keys[pair_codes % len(type_keys)],
+    ])
+    values = pd.to_numeric(df['reading_value'], errors='coerce').to_numpy(dtype=float)
+    times = timestamps.to_numpy(dtype='datetime64[ns]')
+
+    # Sort once so every series is a contiguous block ordered by time
+    # (two stable argsorts beat np.lexsort: the integer codes sort by radix)
+    order = np.argsort(times, kind='stable')
+    order = order[np.argsort(codes[order], kind='stable')]
+    codes, values, times = codes[order], values[order], times[order]
+    bounds = np.flatnonzero(np.append(True, codes[1:] != codes[:-1]))
+    ends = np.append(bounds[1:], len(codes))
+
+    # Thresholds are looked up per series, then broadcast to rows by code
+    limits = thresholds_frame(sensor_configs).set_index(['sensorID', 'reading_type'])
+    limits = limits.reindex(series_keys)
+    min_limit = limits['min_threshold'].to_numpy(dtype=float)[codes]
+    max_limit = limits['max_threshold'].to_numpy(dtype=float)[codes]
+    # NaN thresholds compare False, so unconfigured limits never trigger
+    out = (values < min_limit) | (values > max_limit)
+
+    new_series = np.zeros(len(codes), dtype=bool)
+    new_series[bounds] = True
+
+    # Time each reading is held until the next reading in the same series
+    held = np.zeros(len(times), dtype='int64')
+    held[:-1] = (times[1:] - times[:-1]).astype('int64')
+    held[ends - 1] = 0
+
+    # Run-length detection: a run starts where an out-of-spec reading follows an in-spec one
+    prev_out = np.append(False, out[:-1])
+    run_start = out & (~prev_out | new_series)
+    run_id = np.cumsum(run_start) - 1
+
+    n_series = len(series_keys)
+    run_series = codes[run_start]
+    run_held = np.bincount(run_id[out], weights=held[out], minlength=len(run_series))
+    excursions = np.bincount(run_series, minlength=n_series)
+    total_excursion = np.bincount(run_series, weights=run_held, minlength=n_series)
+    max_excursion = np.zeros(n_series)
+    np.maximum.at(max_excursion, run_series, run_held)
+    total_time = np.add.reduceat(held, bounds).astype(float)
+
+    p95 = np.array([np.nanpercentile(values[lo:hi], 95) if np.isfinite(values[lo:hi]).any() else np.nan
+                    for lo, hi in zip(bounds, ends)])
+    counts = np.add.reduceat(np.isfinite(values).astype(int), bounds)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        stats = pd.DataFrame({
+            'sensorID': series_keys.get_level_values(0)[codes[bounds]],
+            'reading_type': series_keys.get_level_values(1)[codes[bounds]],
+            'excursions': excursions[codes[bounds]],
+            'total_excursion': pd.to_timedelta(total_excursion[codes[bounds]].astype('int64'), unit='ns'),
+            'max_excursion': pd.to_timedelta(max_excursion[codes[bounds]].astype('int64'), unit='ns'),
+            'time_in_spec_pct': np.round(100 * (1 - total_excursion[codes[bounds]] / np.where(total_time > 0, total_time, np.nan)), 2),
+            'min': np.fmin.reduceat(values, bounds),
+            'max': np.fmax.reduceat(values, bounds),
+            'mean': np.add.reduceat(np.nan_to_num(values), bounds) / counts,
+            'p95': p95,
+        })
+
+    return stats[columns].sort_values(by=['sensorID', 'reading_type'], ignore_index=True)
@@ -0,0 +1,262 @@
+import operator
+import time
+
+# Comparison operators supported by where()
+_OPERATORS = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+    'in': lambda value, options: value in options,
+    'not-in': lambda value, options: value not in options,
+    'array_contains': lambda value, item: isinstance(value, list) and item in value,
+}
+
+_MISSING = object()
+
+
+class FakeDocumentSnapshot:
+    """Read-only snapshot of a document, mirroring firestore.DocumentSnapshot."""
+
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self._data = data
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+    def get(self, field):
+        return self._data.get(field) if self._data is not None else None
+
+
+class FakeDocumentReference:
+    """Reference to a single document in a FakeFirestoreClient collection."""
+
+    def __init__(self, client, collection_name, doc_id):
+        self._client = client
+        self._collection_name = collection_name
+        self.id = doc_id
+
+    def _documents(self):
+        return self._client._collections.setdefault(self._collection_name, {})
+
+    def get(self):
+        self._client._round_trip()
+        data = self._documents().get(self.id)
+        self._client._record_read(self._collection_name, [data] if data is not None else [])
+        return FakeDocumentSnapshot(self.id, dict(data) if data is not None else None)
+
+    def set(self, data, merge=False):
+        self._client._round_trip()
+        self._set(data, merge)
+
+    def update(self, data):
+        self._client._round_trip()
+        self._update(data)
+
+    def delete(self):
+        self._client._round_trip()
+        self._delete()
+
+    def _set(self, data, merge=False):
+        documents = self._documents()
+        if merge and self.id in documents:
+            documents[self.id].update(data)
+        else:
+            documents[self.id] = dict(data)
+        self._client.write_count += 1
+
+    def _update(self, data):
+        documents = self._documents()
+        if self.id not in documents:
+            raise KeyError(f"No document to update: {self._collection_name}/{self.id}")
+        documents[self.id].update(data)
+        self._client.write_count += 1
+
+    def _delete(self):
+        self._documents().pop(self.id, None)
+        self._client.write_count += 1
+
+
+class FakeQuery:
+    """Immutable query over a collection supporting where, order_by, start_after and limit."""
+
+    def __init__(self, client, collection_name, filters=(), orders=(), start_after_values=None, limit_count=None):
+        self._client = client
+        self._collection_name = collection_name
+        self._filters = filters
+        self._orders = orders
+        self._start_after_values = start_after_values
+        self._limit_count = limit_count
+
+    def _copy(self, **changes):
+        state = {
+            'filters': self._filters,
+            'orders': self._orders,
+            'start_after_values': self._start_after_values,
+            'limit_count': self._limit_count,
+        }
+        state.update(changes)
+        return FakeQuery(self._client, self._collection_name, **state)
+
+    def where(self, field, op=None, value=None, filter=None):
+        if filter is not None:
+            field, op, value = filter.field_path, filter.op_string, filter.value
+        if op not in _OPERATORS:
+            raise ValueError(f"Unsupported operator: {op}")
+        return self._copy(filters=self._filters + ((field, op, value),))
+
+    def order_by(self, field, direction='ASCENDING'):
+        return self._copy(orders=self._orders + ((field, direction == 'DESCENDING'),))
+
+    def start_after(self, document):
+        if isinstance(document, FakeDocumentSnapshot):
+            values = [document.id if field == '__name__' else document.get(field) for field, _ in self._orders]
+        elif isinstance(document, dict):
+            values = [document.get(field) for field, _ in self._orders]
+        else:
+            values = list(document)
+        return self._copy(start_after_values=values)
+
+    def limit(self, count):
+        return self._copy(limit_count=count)
+
+    def _matches(self, data):
+        for field, op, value in self._filters:
+            field_value = data.get(field, _MISSING)
+            # Firestore never matches documents that lack a filtered field
+            if field_value is _MISSING or not _OPERATORS[op](field_value, value):
+                return False
+        return True
+
+    def _run(self):
+        self._client._round_trip()
+        documents = self._client._collections.get(self._collection_name, {})
+        rows = [(doc_id, data) for doc_id, data in documents.items() if self._matches(data)]
+
+        if self._orders:
+            # Documents missing an order_by field are excluded, as in Firestore
+            rows = [row for row in rows if all(field == '__name__' or field in row[1] for field, _ in self._orders)]
+            for field, descending in reversed(self._orders):
+                rows.sort(key=lambda row: row[0] if field == '__name__' else row[1][field], reverse=descending)
+
+            if self._start_after_values is not None:
+                def position(row):
+                    return [row[0] if field == '__name__' else row[1][field] for field, _ in self._orders]
+
+                def after(row):
+                    for (field, descending), value, cursor in zip(self._orders, position(row), self._start_after_values):
+                        if value != cursor:
+                            return value < cursor if descending else value > cursor
+                    return False
+
+                rows = [row for row in rows if after(row)]
+
+        if self._limit_count is not None:
+            rows = rows[:self._limit_count]
+
+        self._client._record_read(self._collection_name, [data for _, data in rows])
+        return [FakeDocumentSnapshot(doc_id, dict(data)) for doc_id, data in rows]
+
+    def get(self):
+        return self._run()
+
+    def stream(self):
+        return iter(self._run())
+
+
+class FakeCollectionReference(FakeQuery):
+    """Collection reference; also usable as an unfiltered query."""
+
+    def __init__(self, client, collection_name):
+        super().__init__(client, collection_name)
+        self.id = collection_name
+
+    def document(self, doc_id):
+        return FakeDocumentReference(self._client, self._collection_name, doc_id)
+
+
+class FakeWriteBatch:
+    """Write batch that applies its queued writes on commit, like firestore.WriteBatch."""
+
+    def __init__(self, client):
+        self._client = client
+        self._writes = []
+
+    def set(self, reference, data, merge=False):
+        self._writes.append(lambda: reference._set(data, merge=merge))
+
+    def update(self, reference, data):
+        self._writes.append(lambda: reference._update(data))
+
+    def delete(self, reference):
+        self._writes.append(reference._delete)
+
+    def commit(self):
+        # The whole batch is one round trip
+        self._client._round_trip()
+        for write in self._writes:
+            write()
+        self._writes = []
+
+
+class FakeFirestoreClient:
+    """
+    In-memory stand-in for google.cloud.firestore.Client.
+
+    Implements the subset of the API this app uses and counts document reads
+    and writes the way Firestore bills them (a query returning no documents
+    still costs one read), so data-layer performance can be measured offline.
+    Inject it with firestore_utils.set_database().
+
+    Args:
+        latency (float): Seconds each round trip (query, document get, write
+            or batch commit) sleeps, to model network latency. Defaults to none.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self._collections = {}
+        self.read_count = 0
+        self.write_count = 0
+        self.reads_by_collection = {}
+
+    def collection(self, name):
+        return FakeCollectionReference(self, name)
+
+    def batch(self):
+        return FakeWriteBatch(self)
+
+    def reset_counters(self):
+        """Zero the read and write counters."""
+        self.read_count = 0
+        self.write_count = 0
+        self.reads_by_collection = {}
+
+    def load(self, collection_name, documents):
+        """
+        Bulk load documents without counting writes.
+
+        Args:
+            collection_name (str): Target collection.
+            documents (dict): Document data keyed by document ID.
+        """
+        self._collections.setdefault(collection_name, {}).update(
+            {doc_id: dict(data) for doc_id, data in documents.items()}
+        )
+
+    def _round_trip(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _record_read(self, collection_name, documents):
+        reads = max(len(documents), 1)
+        self.read_count += reads
+        self.reads_by_collection[collection_name] = self.reads_by_collection.get(collection_name, 0) + reads
+
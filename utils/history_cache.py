@@ -0,0 +1,139 @@
+import streamlit as st
+import pandas as pd
+
+# Gateways upload buffered readings late, so this trailing window is never marked as loaded
+LATE_UPLOAD_WINDOW = pd.Timedelta(minutes=15)
+# Per-session memory budget; least recently used entries other than the one in use are evicted beyond it
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+
+def merge_intervals(intervals):
+    """
+    Merge overlapping or touching [start, end) intervals.
+
+    Args:
+        intervals (list): List of (start, end) tuples.
+
+    Returns:
+        list: Sorted, non-overlapping list of (start, end) tuples.
+    """
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+def missing_intervals(covered, start, end):
+    """
+    Return the parts of [start, end) that are not in the covered intervals.
+
+    Args:
+        covered (list): Sorted, non-overlapping list of (start, end) tuples.
+        start: Start of the requested range (inclusive).
+        end: End of the requested range (exclusive).
+
+    Returns:
+        list: List of (start, end) tuples still to be fetched.
+    """
+    gaps = []
+    cursor = start
+    for covered_start, covered_end in covered:
+        if covered_end <= cursor:
+            continue
+        if covered_start >= end:
+            break
+        if covered_start > cursor:
+            gaps.append((cursor, covered_start))
+        cursor = max(cursor, covered_end)
+        if cursor >= end:
+            break
+    if cursor < end:
+        gaps.append((cursor, end))
+    return gaps
+
+def _drop_ranges(df, ranges):
+    """Drop rows of a timestamp-sorted DataFrame that fall in any [start, end) range."""
+    keep = pd.Series(True, index=df.index)
+    for range_start, range_end in ranges:
+        lo = df['timestamp'].searchsorted(range_start, side='left')
+        hi = df['timestamp'].searchsorted(range_end, side='left')
+        keep.iloc[lo:hi] = False
+    return df[keep.to_numpy()].reset_index(drop=True)
+
+def get_history_cache():
+    """
+    Get the per-session history cache.
+    Entries are keyed by (collection_name, sensor_id), hold the loaded
+    intervals, the readings DataFrame for them and its size, and are kept
+    in least recently used order.
+    """
+    cache = st.session_state.get("history_cache")
+    if cache is None:
+        cache = {}
+        st.session_state.history_cache = cache
+    return cache
+
+def clear_history_cache():
+    """Drop every cached history entry for this session."""
+    st.session_state.history_cache = {}
+
+def _evict(cache):
+    """Evict least recently used entries until the cache fits MAX_CACHE_BYTES."""
+    total = sum(entry['bytes'] for entry in cache.values())
+    # The entry in use is last and always kept, so a view larger than the budget
+    # still stays cached across reruns instead of being re-read every time
+    while len(cache) > 1 and total > MAX_CACHE_BYTES:
+        oldest = next(iter(cache))
+        total -= cache.pop(oldest)['bytes']
+
+def get_cached_readings(cache_key, start, end, fetch_range):
+    """
+    Return readings in [start, end), fetching only the ranges not yet cached.
+
+    Args:
+        cache_key (tuple): Key identifying the cached series, e.g. (collection_name, sensor_id).
+        start (pd.Timestamp): Start of the range (inclusive, timezone-aware).
+        end (pd.Timestamp): End of the range (exclusive, timezone-aware).
+        fetch_range (callable): Called as fetch_range(gap_start, gap_end) for each
+            missing gap, returning a readings DataFrame with a 'timestamp' column.
+
+    Returns:
+        pd.DataFrame: Readings in the requested range, sorted by timestamp.
+    """
+    cache = get_history_cache()
+    # Re-insert the entry so dict order tracks recency of use
+    entry = cache.pop(cache_key, None) or {'intervals': [], 'df': pd.DataFrame(), 'bytes': 0}
+    cache[cache_key] = entry
+
+    # Never fetch the future, and only mark ranges older than the late upload window as loaded
+    now = pd.Timestamp.now(tz=start.tz)
+    end = min(end, now)
+    settled_end = min(end, now - LATE_UPLOAD_WINDOW)
+
+    if start < end:
+        gaps = missing_intervals(entry['intervals'], start, end)
+        frames = [fetch_range(gap_start, gap_end) for gap_start, gap_end in gaps]
+        frames = [frame for frame in frames if not frame.empty]
+
+        # Cached rows inside a gap come from an earlier fetch of the unsettled window and are re-read
+        if gaps and not entry['df'].empty:
+            entry['df'] = _drop_ranges(entry['df'], gaps)
+        if frames:
+            if not entry['df'].empty:
+                frames.insert(0, entry['df'])
+            entry['df'] = pd.concat(frames, ignore_index=True).sort_values(by='timestamp', kind='stable', ignore_index=True)
+        if start < settled_end:
+            entry['intervals'] = merge_intervals(entry['intervals'] + [(start, settled_end)])
+        if gaps:
+            entry['bytes'] = int(entry['df'].memory_usage(deep=True).sum())
+            _evict(cache)
+
+    df = entry['df']
+    if df.empty:
+        return df
+
+    # Timestamps are sorted, so the range can be sliced by binary search
+    lo = df['timestamp'].searchsorted(start, side='left')
+    hi = df['timestamp'].searchsorted(end, side='left')
+    return df.iloc[lo:hi].reset_index(drop=True)
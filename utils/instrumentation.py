@@ -0,0 +1,425 @@
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+# Rerun summaries are INFO records; the default WARNING level would drop them
+logger = logging.getLogger('metrics')
+logger.setLevel(logging.INFO)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_THIS_FILE = os.path.abspath(__file__)
+
+# Process-wide aggregates for the Prometheus export, shared by every session
+_lock = threading.Lock()
+_json_log_configured = False
+_firestore_totals = {}
+_phase_totals = {}
+
+
+def estimate_document_size(data):
+    """Approximate the stored size of a document in bytes, using Firestore's size rules."""
+    if not data:
+        return 0
+    size = 32
+    for key, value in data.items():
+        size += len(key) + 1
+        if isinstance(value, str):
+            size += len(value) + 1
+        elif isinstance(value, bytes):
+            size += len(value)
+        elif isinstance(value, datetime):
+            size += 8
+        elif isinstance(value, bool) or value is None:
+            size += 1
+        elif isinstance(value, dict):
+            size += estimate_document_size(value)
+        else:
+            size += 8
+    return size
+
+
+def snapshot_size(snapshot):
+    """
+    Estimate a document snapshot's size without copying it.
+
+    to_dict() deep-copies the document, so the snapshot's own data is read
+    instead when the client exposes it, as google-cloud-firestore does.
+    """
+    if not snapshot.exists:
+        return 0
+    data = getattr(snapshot, '_data', None)
+    return estimate_document_size(data if data is not None else snapshot.to_dict())
+
+
+def _call_site():
+    """Return 'path:function' of the nearest app frame outside this module."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if filename != _THIS_FILE and filename.startswith(ROOT):
+            return f"{os.path.relpath(filename, ROOT)}:{frame.f_code.co_name}"
+        frame = frame.f_back
+    return 'unknown'
+
+
+def _rerun_state():
+    """Metrics of the current rerun, or None outside a Streamlit session."""
+    # Touching session state without a script context (api.py, compact.py) logs a warning every time
+    if get_script_run_ctx(suppress_warning=True) is None:
+        return None
+    return st.session_state.get('rerun_metrics')
+
+
+def begin_rerun(page):
+    """Start collecting metrics for a new rerun of the given page."""
+    st.session_state['rerun_metrics'] = {
+        'page': page,
+        'started': time.perf_counter(),
+        'phase_stack': [],
+        'phases': [],
+        'firestore': [],
+    }
+
+
+def end_rerun():
+    """
+    Finish the current rerun: log it as one JSON line on the `metrics` logger,
+    appended to `json_log` if set under [metrics] in secrets, and refresh the
+    Prometheus textfile if `prometheus_textfile` is set there.
+    The rerun's metrics are removed from session state, so nothing recorded
+    afterwards is attributed to it.
+
+    Returns:
+        dict: Summary of the rerun, or None if no rerun was started.
+    """
+    if get_script_run_ctx(suppress_warning=True) is None:
+        return None
+    state = st.session_state.pop('rerun_metrics', None)
+    if state is None:
+        return None
+
+    summary = rerun_summary(state)
+    _configure_json_log()
+    logger.info(json.dumps(summary))
+
+    textfile = _metrics_setting('prometheus_textfile')
+    if textfile:
+        _write_textfile(textfile, prometheus_text())
+    return summary
+
+
+def _write_textfile(path, text):
+    """Atomically replace path with text; each writer uses its own temporary file, so sessions never clash."""
+    with tempfile.NamedTemporaryFile('w', dir=os.path.dirname(os.path.abspath(path)),
+                                     prefix=f"{os.path.basename(path)}.", suffix='.tmp', delete=False) as output:
+        output.write(text)
+    try:
+        os.replace(output.name, path)
+    except OSError:
+        os.unlink(output.name)
+        raise
+
+
+def _configure_json_log():
+    """Attach a file handler for `json_log` under [metrics] in secrets, once per process."""
+    global _json_log_configured
+    with _lock:
+        if _json_log_configured:
+            return
+        _json_log_configured = True
+        path = _metrics_setting('json_log')
+        if path:
+            handler = logging.FileHandler(path)
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            logger.addHandler(handler)
+
+
+def _metrics_setting(key):
+    try:
+        return st.secrets.get("metrics", {}).get(key)
+    except FileNotFoundError:
+        return None
+
+
+def rerun_summary(state):
+    """Condense a rerun's metrics into a JSON-serializable dict."""
+    return {
+        'page': state['page'],
+        'duration_ms': round((time.perf_counter() - state['started']) * 1000, 2),
+        'phases': [{'phase': phase, 'ms': round(seconds * 1000, 2)} for phase, seconds in state['phases']],
+        'firestore_calls': len(state['firestore']),
+        'firestore_reads': sum(event['documents'] for event in state['firestore']),
+        'firestore_bytes': sum(event['bytes'] for event in state['firestore']),
+        'firestore_ms': round(sum(event['seconds'] for event in state['firestore']) * 1000, 2),
+    }
+
+
+@contextmanager
+def render_phase(name):
+    """Time a render phase; phases nest, e.g. 'Home/fetch_latest'."""
+    state = _rerun_state()
+    if state is None:
+        yield
+        return
+
+    state['phase_stack'].append(name)
+    path = '/'.join(state['phase_stack'])
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        state['phase_stack'].pop()
+        state['phases'].append((path, seconds))
+        with _lock:
+            total = _phase_totals.setdefault((state['page'], path), [0, 0.0])
+            total[0] += 1
+            total[1] += seconds
+
+
+def record_firestore_call(operation, collection, documents, size, seconds, call_site=None):
+    """Record one Firestore call for this rerun and the process-wide totals."""
+    call_site = call_site or _call_site()
+    state = _rerun_state()
+    if state is not None:
+        state['firestore'].append({
+            'call_site': call_site,
+            'operation': operation,
+            'collection': collection,
+            'phase': '/'.join(state['phase_stack']),
+            'documents': documents,
+            'bytes': size,
+            'seconds': seconds,
+        })
+
+    page = state['page'] if state is not None else ''
+    with _lock:
+        total = _firestore_totals.setdefault((page, call_site, operation, collection), [0, 0, 0, 0.0])
+        total[0] += 1
+        total[1] += documents
+        total[2] += size
+        total[3] += seconds
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def prometheus_text():
+    """Render the process-wide totals in the Prometheus text exposition format."""
+    lines = []
+    with _lock:
+        firestore_totals = dict(_firestore_totals)
+        phase_totals = dict(_phase_totals)
+
+    metrics = [
+        ('firestore_calls_total', 'counter', 'Firestore calls.', 0),
+        ('firestore_documents_total', 'counter', 'Firestore documents read or written.', 1),
+        ('firestore_bytes_total', 'counter', 'Estimated Firestore document bytes transferred.', 2),
+        ('firestore_seconds_total', 'counter', 'Time spent in Firestore calls.', 3),
+    ]
+    for name, metric_type, help_text, index in metrics:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for (page, call_site, operation, collection), total in sorted(firestore_totals.items()):
+            labels = (f'page="{_escape(page)}",call_site="{_escape(call_site)}",'
+                      f'operation="{_escape(operation)}",collection="{_escape(collection)}"')
+            lines.append(f"{name}{{{labels}}} {total[index]}")
+
+    lines.append("# HELP render_phase_seconds Time spent in each render phase.")
+    lines.append("# TYPE render_phase_seconds summary")
+    for (page, phase), (count, seconds) in sorted(phase_totals.items()):
+        labels = f'page="{_escape(page)}",phase="{_escape(phase)}"'
+        lines.append(f"render_phase_seconds_count{{{labels}}} {count}")
+        lines.append(f"render_phase_seconds_sum{{{labels}}} {seconds}")
+
+    return '\n'.join(lines) + '\n'
+
+
+class _InstrumentedDocument:
+    """Document reference wrapper recording get/set/update/delete calls."""
+
+    def __init__(self, document, collection):
+        self._document = document
+        self._collection = collection
+
+    def get(self, *args, **kwargs):
+        started = time.perf_counter()
+        snapshot = self._document.get(*args, **kwargs)
+        size = snapshot_size(snapshot)
+        record_firestore_call('get', self._collection, 1, size, time.perf_counter() - started, _call_site())
+        return snapshot
+
+    def _write(self, operation, *args, **kwargs):
+        started = time.perf_counter()
+        result = getattr(self._document, operation)(*args, **kwargs)
+        size = estimate_document_size(args[0]) if args and isinstance(args[0], dict) else 0
+        record_firestore_call(operation, self._collection, 1, size, time.perf_counter() - started, _call_site())
+        return result
+
+    def set(self, *args, **kwargs):
+        return self._write('set', *args, **kwargs)
+
+    def update(self, *args, **kwargs):
+        return self._write('update', *args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        return self._write('delete', *args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._document, name)
+
+
+class _InstrumentedQuery:
+    """Collection/query wrapper recording get and stream calls."""
+
+    def __init__(self, query, collection):
+        self._query = query
+        self._collection = collection
+
+    def _wrap(self, method):
+        def wrapped(*args, **kwargs):
+            return _InstrumentedQuery(getattr(self._query, method)(*args, **kwargs), self._collection)
+        return wrapped
+
+    def __getattr__(self, name):
+        if name in ('where', 'order_by', 'limit', 'limit_to_last', 'start_at', 'start_after', 'end_at', 'end_before', 'select', 'offset'):
+            return self._wrap(name)
+        return getattr(self._query, name)
+
+    def document(self, *args, **kwargs):
+        return _InstrumentedDocument(self._query.document(*args, **kwargs), self._collection)
+
+    def get(self, *args, **kwargs):
+        call_site = _call_site()
+        started = time.perf_counter()
+        docs = list(self._query.get(*args, **kwargs))
+        size = sum(snapshot_size(doc) for doc in docs)
+        # Firestore bills a query that matches nothing as one read
+        record_firestore_call('query', self._collection, max(len(docs), 1), size, time.perf_counter() - started, call_site)
+        return docs
+
+    def stream(self, *args, **kwargs):
+        call_site = _call_site()
+        iterator = iter(self._query.stream(*args, **kwargs))
+        documents = 0
+        size = 0
+        seconds = 0.0
+        try:
+            while True:
+                # Only time spent fetching counts, not time spent by the consumer
+                started = time.perf_counter()
+                try:
+                    doc = next(iterator)
+                except StopIteration:
+                    seconds += time.perf_counter() - started
+                    break
+                seconds += time.perf_counter() - started
+                documents += 1
+                size += snapshot_size(doc)
+                yield doc
+        finally:
+            record_firestore_call('query', self._collection, max(documents, 1), size, seconds, call_site)
+
+
+class _InstrumentedBatch:
+    """Write batch wrapper that unwraps document references and records the commit."""
+
+    def __init__(self, batch):
+        self._batch = batch
+        self._collections = {}
+
+    def _add(self, operation, reference, *args, **kwargs):
+        if isinstance(reference, _InstrumentedDocument):
+            self._collections[reference._collection] = self._collections.get(reference._collection, 0) + 1
+            reference = reference._document
+        getattr(self._batch, operation)(reference, *args, **kwargs)
+
+    def set(self, reference, *args, **kwargs):
+        self._add('set', reference, *args, **kwargs)
+
+    def update(self, reference, *args, **kwargs):
+        self._add('update', reference, *args, **kwargs)
+
+    def delete(self, reference, *args, **kwargs):
+        self._add('delete', reference, *args, **kwargs)
+
+    def commit(self, *args, **kwargs):
+        call_site = _call_site()
+        started = time.perf_counter()
+        result = self._batch.commit(*args, **kwargs)
+        seconds = time.perf_counter() - started
+        for collection, documents in self._collections.items():
+            record_firestore_call('batch_commit', collection, documents, 0, seconds, call_site)
+        self._collections = {}
+        return result
+
+
+class InstrumentedClient:
+    """Firestore client wrapper that records every call made through it."""
+
+    def __init__(self, client):
+        self._client = client
+
+    def collection(self, name):
+        return _InstrumentedQuery(self._client.collection(name), name)
+
+    def batch(self):
+        return _InstrumentedBatch(self._client.batch())
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def instrument(client):
+    """Wrap a Firestore client so every call is recorded (idempotent)."""
+    if client is None or isinstance(client, InstrumentedClient):
+        return client
+    return InstrumentedClient(client)
+
+
+def render_profiling_panel():
+    """Render the admin-only profiling panel for the current rerun."""
+    state = _rerun_state()
+    if state is None:
+        return
+
+    with st.expander("Profiling"):
+        summary = rerun_summary(state)
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Rerun (ms)", summary['duration_ms'])
+        col2.metric("Firestore calls", summary['firestore_calls'])
+        col3.metric("Documents read", summary['firestore_reads'])
+        col4.metric("Firestore (ms)", summary['firestore_ms'])
+
+        st.write("**Render phases**")
+        st.dataframe(summary['phases'], use_container_width=True, hide_index=True)
+
+        st.write("**Firestore calls**")
+        st.dataframe([
+            {
+                'Call Site': event['call_site'],
+                'Operation': event['operation'],
+                'Collection': event['collection'],
+                'Phase': event['phase'],
+                'Documents': event['documents'],
+                'Bytes': event['bytes'],
+                'ms': round(event['seconds'] * 1000, 2),
+            }
+            for event in state['firestore']
+        ], use_container_width=True, hide_index=True)
+
+        col1, col2 = st.columns(2)
+        col1.download_button('Download Prometheus metrics', prometheus_text(),
+                             file_name='metrics.prom', mime='text/plain')
+        col2.download_button('Download rerun JSON', json.dumps(summary, indent=2),
+                             file_name='rerun_metrics.json', mime='application/json')
@@ -0,0 +1,183 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+import numpy as np
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import cm
+from reportlab.platypus import Image, PageBreak, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+from utils.excursions import READING_TYPES, compute_excursion_stats
+
+# Below this many sensors, starting worker processes costs more than it saves
+PARALLEL_MIN_SENSORS = 8
+CHART_DPI = 110
+
+TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTSIZE', (0, 0), (-1, -1), 7),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+])
+
+
+def render_sensor_chart(job):
+    """
+    Render one sensor's trend charts with threshold bands to PNG.
+
+    Runs in a worker process, so it only takes plain, picklable data.
+
+    Args:
+        job (dict): sensor_id, name, and series mapping each reading type to
+            (times as datetime64 array, values array, min threshold, max threshold).
+
+    Returns:
+        tuple: (sensor_id, PNG bytes).
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    series = job['series']
+    fig, axes = plt.subplots(len(series), 1, figsize=(8, 2.2 * len(series)), sharex=True, squeeze=False)
+    for ax, (reading_type, (times, values, min_threshold, max_threshold)) in zip(axes[:, 0], series.items()):
+        ax.plot(times, values, linewidth=0.8, color='#1f77b4')
+        if min_threshold is not None and max_threshold is not None:
+            ax.axhspan(min_threshold, max_threshold, color='green', alpha=0.08)
+        if min_threshold is not None:
+            ax.axhline(min_threshold, color='red', linestyle='--', linewidth=0.8)
+        if max_threshold is not None:
+            ax.axhline(max_threshold, color='blue', linestyle='--', linewidth=0.8)
+        ax.set_ylabel(reading_type)
+        ax.grid(True, alpha=0.3)
+    axes[0, 0].set_title(f"{job['name']} ({job['sensor_id']})")
+    fig.autofmt_xdate()
+    fig.tight_layout()
+
+    output = BytesIO()
+    fig.savefig(output, format='png', dpi=CHART_DPI)
+    plt.close(fig)
+    return job['sensor_id'], output.getvalue()
+
+
+def _threshold(config, key):
+    value = config.get(key)
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def build_chart_jobs(df, sensor_configs):
+    """Split readings into one chart job per sensor, with numpy arrays for cheap pickling."""
+    data = df.dropna(subset=['timestamp']).copy()
+    data['sensorID'] = data['sensorID'].astype(str)
+    data['timestamp'] = data['timestamp'].dt.tz_convert('Asia/Kuala_Lumpur').dt.tz_localize(None)
+    data = data.sort_values(by=['sensorID', 'reading_type', 'timestamp'], kind='stable')
+
+    jobs = []
+    for sensor_id, sensor_df in data.groupby('sensorID', sort=True):
+        config = sensor_configs.get(sensor_id, {})
+        series = {}
+        for reading_type in READING_TYPES:
+            readings = sensor_df[sensor_df['reading_type'] == reading_type]
+            if readings.empty:
+                continue
+            series[reading_type] = (
+                readings['timestamp'].to_numpy(dtype='datetime64[ns]'),
+                readings['reading_value'].to_numpy(dtype=float),
+                _threshold(config, f'{reading_type}_min_threshold'),
+                _threshold(config, f'{reading_type}_max_threshold'),
+            )
+        if series:
+            jobs.append({'sensor_id': sensor_id, 'name': config.get('name', f'Sensor {sensor_id}'), 'series': series})
+    return jobs
+
+
+def render_charts(jobs, max_workers=None):
+    """
+    Render chart jobs, in parallel across a process pool when there are enough of them.
+
+    Returns:
+        dict: PNG bytes keyed by sensor ID.
+    """
+    if len(jobs) < PARALLEL_MIN_SENSORS or max_workers == 1:
+        return dict(render_sensor_chart(job) for job in jobs)
+
+    max_workers = max_workers or min(len(jobs), os.cpu_count() or 1)
+    # Spawn rather than fork: forking the multi-threaded Streamlit server can deadlock
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as pool:
+        return dict(pool.map(render_sensor_chart, jobs, chunksize=max(1, len(jobs) // (max_workers * 4))))
+
+
+def _stats_rows(stats):
+    header = ['Device ID', 'Type', 'Excursions', 'Total Out', 'Longest', 'In Spec %', 'Min', 'Max', 'Mean', 'P95']
+    rows = [header]
+    for _, row in stats.iterrows():
+        rows.append([
+            row['sensorID'],
+            row['reading_type'],
+            int(row['excursions']),
+            str(row['total_excursion']),
+            str(row['max_excursion']),
+            '' if np.isnan(row['time_in_spec_pct']) else f"{row['time_in_spec_pct']:.2f}",
+            f"{row['min']:.2f}",
+            f"{row['max']:.2f}",
+            f"{row['mean']:.2f}",
+            f"{row['p95']:.2f}",
+        ])
+    return rows
+
+
+def build_sensor_report(df, sensor_configs, title="Sensor Readings Report", max_workers=None):
+    """
+    Build a multi-page PDF with a fleet summary and per-sensor trend charts and statistics.
+
+    Args:
+        df (pd.DataFrame): Readings from fetch_historical_readings.
+        sensor_configs (dict): Sensor configurations with thresholds.
+        title (str): Report title.
+        max_workers (int): Chart rendering processes. Defaults to the CPU count.
+
+    Returns:
+        BytesIO: The PDF document.
+    """
+    stats = compute_excursion_stats(df, sensor_configs)
+    charts = render_charts(build_chart_jobs(df, sensor_configs), max_workers)
+
+    styles = getSampleStyleSheet()
+    timestamps = df['timestamp'].dropna()
+    period = f"{timestamps.min():%d/%m/%Y %H:%M} - {timestamps.max():%d/%m/%Y %H:%M}" if not timestamps.empty else "No data"
+    story = [
+        Paragraph(title, styles['Title']),
+        Paragraph(f"Period: {period} &nbsp;&nbsp; Sensors: {len(charts)}", styles['Normal']),
+        Spacer(1, 0.5 * cm),
+        Paragraph("Summary", styles['Heading2']),
+        Table(_stats_rows(stats), repeatRows=1, style=TABLE_STYLE),
+    ]
+
+    page_width = A4[0] - 4 * cm
+    for sensor_id, png in charts.items():
+        name = sensor_configs.get(sensor_id, {}).get('name', f'Sensor {sensor_id}')
+        image = Image(BytesIO(png))
+        image.drawHeight = image.drawHeight * page_width / image.drawWidth
+        image.drawWidth = page_width
+        story += [
+            PageBreak(),
+            Paragraph(f"{name} ({sensor_id})", styles['Heading2']),
+            image,
+            Spacer(1, 0.3 * cm),
+            Table(_stats_rows(stats[stats['sensorID'] == sensor_id]), style=TABLE_STYLE),
+        ]
+
+    output = BytesIO()
+    SimpleDocTemplate(output, pagesize=A4, leftMargin=2 * cm, rightMargin=2 * cm,
+                      title=title).build(story)
+    output.seek(0)
+    return output
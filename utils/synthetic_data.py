@@ -0,0 +1,119 @@
+from datetime import datetime, timedelta, timezone
+
+import bcrypt
+import numpy as np
+
+READING_TYPES = ['Temp', 'Pressure', 'FlowRate']
+SYNTHETIC_PASSWORD = 'password'
+
+def sensor_ids(n_sensors):
+    """Return zero-padded sensor IDs '01', '02', ... for n_sensors sensors."""
+    width = max(2, len(str(n_sensors)))
+    return [str(i).zfill(width) for i in range(1, n_sensors + 1)]
+
+def generate_sensor_configurations(n_sensors):
+    """Generate 'sensor_configurations' documents with thresholds for each sensor."""
+    return {
+        sensor_id: {
+            'name': f'Sensor {sensor_id}',
+            'Temp_min_threshold': 20,
+            'Temp_max_threshold': 80,
+            'Pressure_min_threshold': 10,
+            'Pressure_max_threshold': 90,
+            'FlowRate_min_threshold': 5,
+            'FlowRate_max_threshold': 95,
+        }
+        for sensor_id in sensor_ids(n_sensors)
+    }
+
+def generate_gateway_documents(n_sensors, n_days, interval_seconds=60, end=None, seed=0):
+    """
+    Generate 'iot_gateway_data' documents, one per gateway upload.
+
+    Each document holds a 'timestamp' plus a '<Type>_<sensorID>' field per
+    sensor and reading type, like the documents the gateway writes. Values
+    follow a slow sine wave with noise so that some readings cross thresholds.
+
+    Args:
+        n_sensors (int): Number of sensors.
+        n_days (int): Number of days of history, ending at `end`.
+        interval_seconds (int): Seconds between uploads.
+        end (datetime): End of the history (exclusive). Defaults to now.
+        seed (int): Random seed, so runs are repeatable.
+
+    Returns:
+        dict: Documents keyed by document ID.
+    """
+    end = end or datetime.now(timezone.utc)
+    n_uploads = int(n_days * 86400 // interval_seconds)
+    start = end - timedelta(seconds=n_uploads * interval_seconds)
+    rng = np.random.default_rng(seed)
+    ids = sensor_ids(n_sensors)
+
+    phase = np.linspace(0, n_days * 2 * np.pi, n_uploads, endpoint=False)[:, None]
+    offsets = rng.uniform(0, 2 * np.pi, size=(1, n_sensors))
+    values = {
+        reading_type: np.round(50 + 35 * np.sin(phase + offsets) + rng.normal(0, 5, size=(n_uploads, n_sensors)), 2)
+        for reading_type in READING_TYPES
+    }
+
+    documents = {}
+    for i in range(n_uploads):
+        timestamp = start + timedelta(seconds=i * interval_seconds)
+        record = {'timestamp': timestamp}
+        for reading_type in READING_TYPES:
+            row = values[reading_type][i]
+            for j, sensor_id in enumerate(ids):
+                record[f'{reading_type}_{sensor_id}'] = float(row[j])
+        documents[f'upload_{i:08d}'] = record
+    return documents
+
+def generate_current_reading(n_sensors, timestamp=None, seed=0):
+    """Generate the 'current_reading' document read by the Home page."""
+    timestamp = timestamp or datetime.now(timezone.utc)
+    rng = np.random.default_rng(seed)
+    record = {'Timestamp': timestamp.strftime('%Y-%m-%d %H:%M')}
+    for sensor_id in sensor_ids(n_sensors):
+        for reading_type in READING_TYPES:
+            record[f'{reading_type}_{sensor_id}'] = str(round(float(rng.uniform(0, 100)), 2))
+    return record
+
+def generate_users(n_users):
+    """
+    Generate 'users' documents: one super_admin, one admin and n_users - 2 users.
+    Every account uses SYNTHETIC_PASSWORD.
+    """
+    password = bcrypt.hashpw(SYNTHETIC_PASSWORD.encode('utf-8'), bcrypt.gensalt(rounds=4)).decode('utf-8')
+    users = {}
+    for i in range(n_users):
+        role = 'super_admin' if i == 0 else 'admin' if i == 1 else 'user'
+        users[f'user{i}'] = {
+            'name': f'User {i}',
+            'email': f'user{i}@example.com',
+            'password': password,
+            'role': role,
+        }
+    return users
+
+def populate(client, n_sensors=10, n_days=7, interval_seconds=60, n_users=10, end=None, seed=0):
+    """
+    Fill a FakeFirestoreClient with a synthetic dataset.
+
+    Args:
+        client (FakeFirestoreClient): Client to load.
+        n_sensors (int): Number of sensors.
+        n_days (int): Days of gateway history.
+        interval_seconds (int): Seconds between gateway uploads.
+        n_users (int): Number of user accounts.
+        end (datetime): End of the history. Defaults to now.
+        seed (int): Random seed.
+
+    Returns:
+        FakeFirestoreClient: The same client, for chaining.
+    """
+    client.load('sensor_configurations', generate_sensor_configurations(n_sensors))
+    client.load('iot_gateway_data', generate_gateway_documents(n_sensors, n_days, interval_seconds, end, seed))
+    client.load('iot_gateway_data', {'current_reading': generate_current_reading(n_sensors, end, seed)})
+    client.load('users', generate_users(n_users))
+    client.reset_counters()
+    return client